@@ -0,0 +1,277 @@
+"""
+Benchmark headless do pipeline do dashboard com dados sintéticos.
+
+Os tempos são comparados com o baseline como razão sobre a etapa `referencia` (uma carga
+fixa de pandas/NumPy medida intercalada com cada etapa), para que a comparação valha em
+máquinas de velocidades diferentes e não dependa de oscilações de carga durante a execução.
+Mesmo assim o baseline é da máquina em que foi gerado: antes de usar o gate em outra
+máquina (ou CI), regenere-o localmente com
+
+    python -m benchmarks.executar --salvar-baseline
+
+e compare as execuções seguintes com `python -m benchmarks.executar`.
+"""
+import argparse
+import io
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.gerar_dados import gerar, salvar_csv
+
+BASELINE_PADRAO = Path(__file__).with_name("baseline.json")
+REFERENCIA = "referencia"
+
+# Etapas na ordem de execução; cada uma recebe e enriquece o dicionário de contexto
+ETAPAS = {}
+
+
+def etapa(nome):
+    def registrar(funcao):
+        ETAPAS[nome] = funcao
+        return funcao
+    return registrar
+
+
+@etapa(REFERENCIA)
+def _referencia(ctx):
+    # Carga fixa, independente do código do dashboard: mede a velocidade da máquina nesta execução
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'chave': rng.integers(0, 1000, 500_000), 'valor': rng.random(500_000)})
+    df.groupby('chave')['valor'].agg(['sum', 'mean']).sort_values('sum')
+
+
+@etapa("ingest_legado")
+def _ingest_legado(ctx):
+    # Leitura original de home.show (tipos inferidos e data sem formato fixo)
+    df = pd.read_csv(io.BytesIO(ctx['csv']), sep=',')
+    df['Data'] = pd.to_datetime(df['Data'], dayfirst=True)
+
+
+@etapa("ingest_schema")
+def _ingest_schema(ctx):
+    from src.utils.ingest import ler_csv
+    ctx['df'] = ler_csv(io.BytesIO(ctx['csv']))
+
+
+@etapa("filtro_legado")
+def _filtro_legado(ctx):
+    # Máscaras booleanas que ocupacao_geral.show aplicava a cada rerun
+    df = ctx['df']
+    df_internacao = df[df['Origem'] == 'Internação'].copy()
+    setores = df_internacao['Setor'].unique()
+    for ano, mes in ctx['meses']:
+        df_internacao[(df_internacao['Data'].dt.year == ano) & (df_internacao['Data'].dt.month == mes)
+                      & (df_internacao['Setor'].isin(setores))]
+
+
+@etapa("cubo")
+def _cubo(ctx):
+    from src.utils.cubo import CuboOcupacao
+    ctx['cubo'] = CuboOcupacao(ctx['df'])
+
+
+@etapa("filtro_cubo")
+def _filtro_cubo(ctx):
+    cubo = ctx['cubo']
+    setores = cubo.setores('Internação', ctx['meses'][-1][0])
+    ctx['fatias'] = [cubo.mes('Internação', ano, mes, setores) for ano, mes in ctx['meses']]
+
+
+@etapa("consulta_parquet")
+def _consulta_parquet(ctx):
+    # Mesmos recortes de filtro_cubo, empurrados para o Parquet pelo motor de consulta (sem cubo em memória)
+    from src.utils.consultas import obter_motor_consulta
+    from src.utils.cubo import CuboParquet
+    if 'parquet' not in ctx:
+        ctx['parquet'] = ctx['temporario'] / "dataset.parquet"
+        ctx['df'].to_parquet(ctx['parquet'], index=False)
+    cubo = CuboParquet([ctx['parquet']], obter_motor_consulta() or obter_motor_consulta('arrow'))
+    setores = cubo.setores('Internação', ctx['meses'][-1][0])
+    for ano, mes in ctx['meses']:
+        cubo.mes('Internação', ano, mes, setores)
+
+
+@etapa("agregacao_diaria")
+def _agregacao_diaria(ctx):
+    from src.utils.cubo import diario
+    from src.utils.previsao import serie_ocupacao
+    for fatia in ctx['fatias']:
+        diario(fatia)
+    ctx['serie'] = serie_ocupacao(ctx['cubo'].origem('Internação'))
+
+
+@etapa("indicadores")
+def _indicadores(ctx):
+    from src.utils.indicadores import base_indicadores, consolidar
+    base = base_indicadores(ctx['cubo'])
+    for ano, mes in ctx['meses']:
+        consolidar(base, 'Internação', ano, mes)
+
+
+@etapa("previsao_rapido")
+def _previsao_rapido(ctx):
+    from src.utils.motores import MotorRapido
+    motor = MotorRapido()
+    motor.prever(motor.ajustar(ctx['serie'], motor.config_padrao), 30)
+
+
+@etapa("previsao_prophet")
+def _previsao_prophet(ctx):
+    from src.utils.motores import MotorProphet, prophet_disponivel
+    if not prophet_disponivel():
+        return
+    motor = MotorProphet()
+    motor.prever(motor.ajustar(ctx['serie'], motor.config_padrao), 30)
+
+
+@etapa("figuras")
+def _figuras(ctx):
+    from src.utils import graficos
+    from src.utils.cubo import diario
+    fatia = ctx['fatias'][-1]
+    df_diario = diario(fatia)
+    figuras = [
+        graficos.evolucao(df_diario, df_diario.iloc[0:0], None),
+        graficos.treemap_setores(fatia.groupby('Setor', observed=True)['Paciente/Dia'].sum().reset_index()),
+        graficos.movimentacao(df_diario),
+        graficos.box_dia_semana(*graficos.estatisticas_box(fatia['Data'], fatia['Paciente/Dia'])),
+    ]
+    for fig in figuras:
+        fig.to_json()
+
+
+@etapa("render_pagina")
+def _render_pagina(ctx):
+    # Execução headless da página de ocupação (sem navegador)
+    from streamlit.testing.v1 import AppTest
+    from src.utils.compartilhado import abrir
+    from src.utils.ingest import hash_conteudo
+    if 'dataset' not in ctx:
+        ctx['dataset'] = abrir(hash_conteudo(ctx['csv']), lambda: ctx['df'])
+    app = AppTest.from_file(str(Path(__file__).resolve().parent.parent / "streamlit_app.py"), default_timeout=600)
+    app.run()
+    app.session_state['dataset'] = ctx['dataset']
+    app.sidebar.radio[0].set_value("Taxa de Ocupação Hospitalar")
+    app.run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+
+
+def _cronometrar(funcao, ctx):
+    inicio = time.perf_counter()
+    funcao(ctx)
+    return time.perf_counter() - inicio
+
+
+def medir(etapas, ctx, repeticoes):
+    """
+    Tempo (melhor de N execuções), tempo relativo à referência e pico de memória (tracemalloc)
+    de cada etapa. A referência roda intercalada com as repetições de cada etapa, e a razão
+    usa o melhor tempo dela nessa mesma janela.
+    """
+    resultados = {}
+    for nome in etapas:
+        funcao = ETAPAS[nome]
+        tempos, referencias = [], []
+        for _ in range(repeticoes):
+            referencias.append(_cronometrar(ETAPAS[REFERENCIA], ctx))
+            tempos.append(_cronometrar(funcao, ctx))
+
+        tracemalloc.start()
+        funcao(ctx)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        tempo, relativo = min(tempos), min(tempos) / min(referencias)
+        resultados[nome] = {'tempo_s': round(tempo, 6), 'relativo': round(relativo, 4),
+                            'pico_mb': round(pico / 1024 ** 2, 3)}
+        print(f"  {nome:<18} {tempo:9.4f} s {relativo:8.2f}x {pico / 1024 ** 2:9.2f} MB", file=sys.stderr)
+    return resultados
+
+
+def comparar(resultados, baseline, tolerancia, piso_s=0.02):
+    """
+    Lista as etapas que ficaram mais lentas ou mais pesadas que o baseline além da tolerância.
+    O tempo é comparado pela razão sobre a etapa de referência de cada execução; a diferença
+    só conta acima de `piso_s`, convertida para segundos na máquina atual.
+    """
+    regressoes = []
+    referencia = resultados[REFERENCIA]['tempo_s']
+    for nome, atual in resultados.items():
+        base = baseline.get('etapas', {}).get(nome)
+        if base is None or nome == REFERENCIA:
+            continue
+        if (atual['relativo'] > base['relativo'] * (1 + tolerancia)
+                and (atual['relativo'] - base['relativo']) * referencia > piso_s):
+            regressoes.append(f"{nome}: tempo {base['relativo']:.2f}x -> {atual['relativo']:.2f}x da referência "
+                              f"({atual['tempo_s']:.4f}s)")
+        if atual['pico_mb'] > base['pico_mb'] * (1 + tolerancia) and atual['pico_mb'] - base['pico_mb'] > 1:
+            regressoes.append(f"{nome}: memória {base['pico_mb']:.1f}MB -> {atual['pico_mb']:.1f}MB")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark headless do pipeline do dashboard com dados sintéticos.",
+        epilog="O baseline é específico da máquina: gere-o localmente com --salvar-baseline antes de comparar.")
+    parser.add_argument("--setores", type=int, default=20)
+    parser.add_argument("--anos", type=int, default=3)
+    parser.add_argument("--origens", type=int, default=2)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--etapas", default=",".join(ETAPAS), help="Etapas separadas por vírgula")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PADRAO)
+    parser.add_argument("--salvar-baseline", action="store_true", help="Grava o resultado como novo baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.5, help="Piora relativa aceita (0.5 = 50%%)")
+    parser.add_argument("--saida", type=Path, help="Grava o resultado em JSON")
+    args = parser.parse_args()
+
+    config = {'setores': args.setores, 'anos': args.anos, 'origens': args.origens}
+    df = gerar(args.setores, args.anos, args.origens, fim='2025-12-31')
+    buffer = io.StringIO()
+    salvar_csv(df, buffer)
+    datas = df['Data'].drop_duplicates()
+    etapas = [e.strip() for e in args.etapas.split(",") if e.strip()]
+    # Etapas posteriores dependem dos dados preparados pelas anteriores
+    obrigatorias = [REFERENCIA, "ingest_schema", "cubo", "filtro_cubo", "agregacao_diaria"]
+    etapas = [e for e in ETAPAS if e in etapas or e in obrigatorias]
+
+    # Arquivos auxiliares das etapas (ex.: a cópia em Parquet) são removidos ao final
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as temporario:
+        ctx = {'csv': buffer.getvalue().encode(), 'temporario': Path(temporario),
+               'meses': sorted({(d.year, d.month) for d in datas})}
+        print(f"Dataset sintético: {len(df)} linhas, {len(ctx['csv']) / 1024 ** 2:.1f} MB de CSV", file=sys.stderr)
+        resultado = {'config': config, 'etapas': medir(etapas, ctx, args.repeticoes)}
+
+    if args.saida:
+        args.saida.write_text(json.dumps(resultado, indent=2))
+
+    if args.salvar_baseline:
+        args.baseline.write_text(json.dumps(resultado, indent=2) + "\n")
+        print(f"Baseline gravado em {args.baseline}", file=sys.stderr)
+        return
+
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get('config') != config:
+            print("Aviso: baseline gerado com outra configuração de dataset; comparação pode não ser válida.", file=sys.stderr)
+        if REFERENCIA not in baseline.get('etapas', {}):
+            print("Baseline sem a etapa de referência: regenere-o com --salvar-baseline.", file=sys.stderr)
+            sys.exit(2)
+        regressoes = comparar(resultado['etapas'], baseline, args.tolerancia)
+        if regressoes:
+            print("Regressões em relação ao baseline:", file=sys.stderr)
+            for r in regressoes:
+                print(f"  - {r}", file=sys.stderr)
+            sys.exit(1)
+        print("Sem regressões em relação ao baseline.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
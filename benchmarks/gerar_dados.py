@@ -0,0 +1,93 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+ORIGENS = ['Internação', 'Pronto Socorro', 'Ambulatório']
+TIPOS_SETOR = ['Clínica Médica', 'Clínica Cirúrgica', 'UTI Adulto', 'Pediatria', 'Ortopedia', 'Obstetrícia']
+
+# Mais internações no início da semana e menos no fim de semana (segunda = 0)
+EFEITO_SEMANA = np.array([1.20, 1.10, 1.05, 1.00, 0.95, 0.80, 0.90])
+
+
+def gerar(setores=10, anos=2, origens=1, fim=None, semente=0):
+    """
+    Gera movimentação setorial diária sintética no formato do CSV exportado
+    (colunas esperadas por home.show e ocupacao_geral.show).
+
+    O censo de cada setor evolui como um processo de fila: internações Poisson com
+    sazonalidade semanal e anual e saídas binomiais sobre o censo do dia anterior,
+    de modo que Paciente/Dia, Intern. e Saídas sejam coerentes entre si.
+    """
+    rng = np.random.default_rng(semente)
+    fim = pd.Timestamp(fim) if fim is not None else pd.Timestamp.today().normalize()
+    datas = pd.date_range(fim - pd.DateOffset(years=anos) + pd.Timedelta(days=1), fim, freq='D')
+    origens = ORIGENS[:max(1, min(origens, len(ORIGENS)))]
+
+    blocos = []
+    for origem in origens:
+        nomes = [f"{TIPOS_SETOR[i % len(TIPOS_SETOR)]} {i // len(TIPOS_SETOR) + 1}" for i in range(setores)]
+        if origem != 'Internação':
+            nomes = [f"{origem} - {n}" for n in nomes]
+
+        leitos = rng.integers(8, 40, size=setores)
+        permanencia = rng.uniform(2.5, 9.0, size=setores)  # dias
+        ocupacao_alvo = rng.uniform(0.75, 0.97, size=setores)
+        p_saida = 1 / permanencia
+        p_obito = rng.uniform(0.01, 0.08, size=setores)
+
+        dias = len(datas)
+        sazonal = (EFEITO_SEMANA[datas.dayofweek.to_numpy()][:, None]
+                   * (1 + 0.08 * np.cos(2 * np.pi * (datas.dayofyear.to_numpy()[:, None] - 180) / 365)))
+        lam = leitos * ocupacao_alvo * p_saida * sazonal
+
+        censo = np.empty((dias, setores), dtype=np.int64)
+        internacoes = rng.poisson(lam)
+        saidas = np.empty_like(censo)
+        atual = np.round(leitos * ocupacao_alvo).astype(np.int64)
+        for t in range(dias):
+            saidas[t] = rng.binomial(atual, p_saida)
+            atual = atual - saidas[t] + internacoes[t]
+            censo[t] = atual
+        obitos = rng.binomial(saidas, p_obito)
+
+        blocos.append(pd.DataFrame({
+            'Data': np.repeat(datas, setores),
+            'Setor': np.tile(nomes, dias),
+            'Origem': origem,
+            'Leitos Ativos': np.tile(leitos, dias),
+            'Leitos-dia': np.tile(leitos, dias),
+            'Paciente/Dia': censo.ravel(),
+            'Intern.': internacoes.ravel(),
+            'Saídas': saidas.ravel(),
+            'Altas': (saidas - obitos).ravel(),
+            'Óbitos': obitos.ravel(),
+        }))
+
+    return pd.concat(blocos, ignore_index=True)
+
+
+def salvar_csv(df, caminho):
+    """Grava no mesmo formato da exportação (datas dd/mm/aaaa, separador vírgula)."""
+    saida = df.copy()
+    saida['Data'] = saida['Data'].dt.strftime('%d/%m/%Y')
+    saida.to_csv(caminho, index=False, sep=',')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um CSV sintético de movimentação setorial.")
+    parser.add_argument("saida", help="Caminho do CSV a ser gerado")
+    parser.add_argument("--setores", type=int, default=10)
+    parser.add_argument("--anos", type=int, default=2)
+    parser.add_argument("--origens", type=int, default=1, help=f"1 a {len(ORIGENS)} ({', '.join(ORIGENS)})")
+    parser.add_argument("--fim", default=None, help="Última data (aaaa-mm-dd); padrão: hoje")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    df = gerar(args.setores, args.anos, args.origens, args.fim, args.semente)
+    salvar_csv(df, args.saida)
+    print(f"{len(df)} linhas gravadas em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,112 @@
 import streamlit as st
-import pandas as pd
+from src.utils.ingest import (carregar_dataset, hash_conteudo, anexar_csv,
+                              carregar_historico, hash_historico, particoes_historico)
+from src.utils.desempenho import trecho
+from src.utils.compartilhado import abrir
+from src.utils.consultas import DatasetParquet, fontes_do_dataset, obter_motor_consulta
+
+MODO_COMPLETO = "Arquivo completo"
+MODO_INCREMENTAL = "Incremental (anexar ao histórico)"
+
+def usar_dataset(referencia):
+    """
+    Aponta a sessão para um dataset do repositório compartilhado (sem cópia) ou, com motor
+    de consulta colunar, para os seus arquivos Parquet. A sessão guarda só o handle, que
+    mantém o dataset vivo enquanto ela o usar; as páginas leem os dados por ele.
+    """
+    st.session_state.dataset = referencia
+
+def dataset_atual(chave):
+    """True se a sessão já aponta para o dataset `chave`."""
+    referencia = st.session_state.get('dataset')
+    return referencia is not None and referencia.chave == chave
+
+def carregar_arquivo_completo(uploaded_file):
+    """Substitui o dataset da sessão pelo conteúdo do arquivo enviado."""
+    # Mesmo upload do rerun anterior (file_id não mudou): nem lê nem calcula o hash de novo
+    anterior = st.session_state.get('upload')
+    if anterior is not None and anterior[0] == uploaded_file.file_id and dataset_atual(anterior[1]):
+        return
+
+    conteudo = uploaded_file.getvalue()
+    with trecho("upload.hash", bytes=len(conteudo)):
+        chave = hash_conteudo(conteudo)
+
+    # Só processa o arquivo se ele mudou desde o último rerun
+    if not dataset_atual(chave):
+        # Leitura com schema explícito; o Parquet em disco evita reprocessar o mesmo arquivo
+        # e sessões que enviam o mesmo arquivo compartilham uma única cópia em memória
+        with trecho("upload.leitura"):
+            if obter_motor_consulta() is not None:
+                # As páginas consultam o Parquet: basta gravá-lo, sem manter o DataFrame em memória
+                if fontes_do_dataset(chave) is None:
+                    carregar_dataset(conteudo)
+                referencia = DatasetParquet(chave, fontes_do_dataset(chave))
+            else:
+                referencia = abrir(chave, lambda: carregar_dataset(conteudo)[1])
+
+        usar_dataset(referencia)
+    st.session_state.upload = (uploaded_file.file_id, chave)
+
+def carregar_incremental(uploaded_file):
+    """Anexa o arquivo ao histórico em disco e carrega o histórico consolidado na sessão."""
+    # O hash só é calculado para um upload novo (file_id diferente do último anexado)
+    if uploaded_file is not None and st.session_state.get('ultimo_anexo_id') != uploaded_file.file_id:
+        chave_arquivo = hash_conteudo(uploaded_file.getvalue())
+        if st.session_state.get('ultimo_anexo') != chave_arquivo:
+            with st.spinner("Anexando arquivo ao histórico..."), trecho("upload.anexar"):
+                resumo = anexar_csv(uploaded_file)
+            st.session_state.ultimo_anexo = chave_arquivo
+            st.toast(f"{resumo['linhas']} registros anexados ({len(resumo['meses'])} meses atualizados).")
+        st.session_state.ultimo_anexo_id = uploaded_file.file_id
+
+    chave = hash_historico()
+    if not dataset_atual(chave):
+        if not particoes_historico():
+            return
+        with trecho("historico.leitura"):
+            if obter_motor_consulta() is not None:
+                referencia = DatasetParquet(chave, particoes_historico())
+            else:
+                referencia = abrir(chave, carregar_historico)
+        usar_dataset(referencia)
 
 def show():
     # Banner e Títulos
     st.title("📊 Data Science Hospitalar")
     st.subheader("Transformando indicadores de saúde em eficiência operacional.")
-    
+
     st.markdown("---")
-    
+
     st.info("💡 **Dica:** O arquivo deve conter colunas de movimentação (Internações, Altas, Óbitos) por Setor.")
-    
+
+    modo = st.radio("Modo de carga", [MODO_COMPLETO, MODO_INCREMENTAL], horizontal=True,
+                    help="""**Arquivo completo:** o arquivo enviado substitui os dados da sessão.
+**Incremental:** o arquivo (ex.: apenas o último mês) é anexado ao histórico salvo no servidor, sem reprocessar os meses anteriores.""")
+
+    if modo == MODO_INCREMENTAL:
+        meses_salvos = len(particoes_historico())
+        st.caption(f"Histórico salvo: {meses_salvos} meses.")
+
     uploaded_file = st.file_uploader("Upload do arquivo CSV de movimentação setorial", type=["csv"])
-    
-    if uploaded_file is not None:
-        try:
-            # Lendo com separador de vírgula conforme sua amostra
-            df = pd.read_csv(uploaded_file, sep=',')
-            
-            # Conversão da coluna Data (ajuste o formato se necessário)
-            df['Data'] = pd.to_datetime(df['Data'], dayfirst=True)
-            
-            # Armazenando no session_state
-            st.session_state.df = df
-            
-            st.success(f"Sucesso! {len(df)} registros carregados.")
-            st.write("### Prévia dos Dados")
-            st.dataframe(df.head(), use_container_width=True)
-            
-        except Exception as e:
-            st.error(f"Erro ao processar o arquivo: {e}")
\ No newline at end of file
+
+    if uploaded_file is None and modo == MODO_COMPLETO:
+        return
+
+    try:
+        if modo == MODO_COMPLETO:
+            carregar_arquivo_completo(uploaded_file)
+        else:
+            carregar_incremental(uploaded_file)
+
+        referencia = st.session_state.get('dataset')
+        if referencia is None:
+            return
+
+        st.success(f"Sucesso! {referencia.linhas} registros carregados.")
+        st.write("### Prévia dos Dados")
+        with trecho("previa"):
+            st.dataframe(referencia.previa(), use_container_width=True)
+
+    except Exception as e:
+        st.error(f"Erro ao processar o arquivo: {e}")
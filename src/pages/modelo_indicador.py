@@ -0,0 +1,112 @@
+import streamlit as st
+
+from src.utils.cubo import obter_cubo
+from src.utils.indicadores import INDICADORES, obter_indicadores, consolidar, disponiveis, recortar
+from src.utils.paginas import importar
+
+MESES_NOMES_PT = {1:'Janeiro', 2:'Fevereiro', 3:'Março', 4:'Abril', 5:'Maio', 6:'Junho', 7:'Julho', 8:'Agosto', 9:'Setembro', 10:'Outubro', 11:'Novembro', 12:'Dezembro'}
+
+def setores_sugeridos(base, padrao):
+    """Setores cujo nome (ou Origem) casa com o padrão da página; vazio se nenhum casar."""
+    if not padrao:
+        return sorted(base['Setor'].unique().tolist())
+    nomes = base['Setor'].astype(str)
+    casa = nomes.str.contains(padrao, case=False, regex=True) | base['Origem'].astype(str).str.contains(padrao, case=False, regex=True)
+    return sorted(base.loc[casa, 'Setor'].unique().tolist())
+
+def show_indicador(titulo, indicador, padrao_setor=None, secundarios=(), descricao="", origem='Internação'):
+    """
+    Página padrão de indicador: filtros na sidebar, scorecards, evolução mensal e ranking por setor.
+    Todos os números são lidos da base de indicadores (calculada uma vez por dataset), sempre
+    restritos a uma Origem (`origem` por padrão, como a página de Ocupação Hospitalar).
+    """
+    st.title(titulo)
+    referencia = st.session_state.get('dataset')
+    if referencia is None:
+        st.error("Por favor, carregue os dados na Página Inicial.")
+        return
+
+    chave = referencia.chave
+    base = obter_indicadores(chave, obter_cubo(chave, referencia))
+
+    if indicador not in disponiveis(base.columns):
+        colunas = ", ".join(INDICADORES[indicador]['colunas'])
+        st.warning(f"O arquivo carregado não possui as colunas necessárias para este indicador ({colunas}).")
+        return
+
+    info = INDICADORES[indicador]
+
+    with st.sidebar:
+        st.header("⚙️ Filtros")
+        origens = sorted(base['Origem'].astype(str).unique().tolist())
+        preferida = next((o for o in (origem, 'Internação') if o in origens), origens[0])
+        origem_sel = st.selectbox("Origem", origens, index=origens.index(preferida),
+                                  help="Tipo de atendimento considerado nos indicadores. Origens diferentes não são somadas.")
+        base = recortar(base, origem=origem_sel)
+        sugeridos = setores_sugeridos(base, padrao_setor)
+
+        anos = sorted(base['Ano'].unique().tolist(), reverse=True)
+        ano_sel = st.selectbox("Ano de Análise", anos)
+        meses_disp = sorted(base.loc[base['Ano'] == ano_sel, 'Mes'].unique().tolist())
+        mes_sel = st.selectbox("Mês de Análise", meses_disp, format_func=lambda x: MESES_NOMES_PT[x])
+        setores_disp = sorted(base.loc[base['Ano'] == ano_sel, 'Setor'].unique().tolist())
+        padrao = [s for s in sugeridos if s in setores_disp] or setores_disp
+        setores_sel = st.multiselect("Setores", setores_disp, default=padrao)
+
+    if descricao:
+        st.write(descricao)
+    if padrao_setor and not sugeridos:
+        st.info("Nenhum setor foi identificado automaticamente para esta página; selecione os setores na barra lateral.")
+
+    atual = consolidar(base, origem_sel, ano_sel, mes_sel, setores_sel)
+    anterior = consolidar(base, origem_sel, ano_sel - 1, mes_sel, setores_sel)
+    if atual.get('Linhas', 0) == 0:
+        st.warning("Não há dados para os filtros selecionados.")
+        return
+
+    # --- SCORECARDS ---
+    st.header("📈 Scorecards de Performance")
+    nomes = [indicador] + [s for s in secundarios if s in disponiveis(base.columns)]
+    k_cols = st.columns(len(nomes))
+    for col, nome in zip(k_cols, nomes):
+        ind = INDICADORES[nome]
+        delta = atual[nome] - anterior[nome]
+        col.metric(ind['rotulo'], ind['formato'].format(atual[nome]),
+                   f"{delta:+.2f} vs ano ant." if anterior.get('Linhas', 0) > 0 else None,
+                   delta_color="inverse" if ind['inverso'] else "normal", help=ind['ajuda'])
+
+    go = importar('plotly.graph_objects')
+    col_graf1, col_graf2 = st.columns(2)
+
+    # --- EVOLUÇÃO MENSAL (ANO ATUAL x ANTERIOR) ---
+    with col_graf1:
+        with st.container(border=True):
+            st.subheader(f"Evolução Mensal — {info['rotulo']}",
+                         help="Indicador mês a mês no ano selecionado, com o ano anterior como referência (linha tracejada).")
+            mensal = consolidar(base, origem_sel, setores=setores_sel, por=['Ano', 'Mes'])
+            fig = go.Figure()
+            for ano, estilo in ((ano_sel - 1, dict(color='gray', dash='dash')), (ano_sel, dict(color='#1f77b4', width=3))):
+                serie = mensal[mensal['Ano'] == ano]
+                if serie.empty:
+                    continue
+                fig.add_trace(go.Scatter(x=serie['Mes'].map(MESES_NOMES_PT), y=serie[indicador], name=str(ano),
+                                         mode='lines+markers', line=estilo))
+            fig.update_layout(hovermode="x unified", margin=dict(l=10, r=10, t=30, b=10),
+                              legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+            st.plotly_chart(fig, use_container_width=True)
+
+    # --- RANKING POR SETOR ---
+    por_setor = consolidar(base, origem_sel, ano_sel, mes_sel, setores_sel, por='Setor')
+    with col_graf2:
+        with st.container(border=True):
+            st.subheader("Comparativo por Setor", help="Valor do indicador em cada setor selecionado no mês de análise.")
+            ordenado = por_setor.sort_values(indicador)
+            fig_bar = go.Figure(go.Bar(x=ordenado[indicador], y=ordenado['Setor'].astype(str), orientation='h',
+                                       marker_color='#1f77b4'))
+            fig_bar.update_layout(margin=dict(l=10, r=10, t=10, b=10))
+            st.plotly_chart(fig_bar, use_container_width=True)
+
+    with st.expander("📋 Indicadores por Setor", expanded=False):
+        colunas = ['Setor'] + nomes
+        tabela = por_setor[colunas].rename(columns={n: INDICADORES[n]['rotulo'] for n in nomes})
+        st.dataframe(tabela, use_container_width=True, hide_index=True)
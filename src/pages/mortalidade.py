@@ -0,0 +1,6 @@
+from src.pages.modelo_indicador import show_indicador
+
+def show():
+    show_indicador("🕯️ Taxa de Mortalidade", 'mortalidade', padrao_setor=r"^Interna",
+                   secundarios=('permanencia', 'ocupacao'),
+                   descricao="Proporção de óbitos entre as saídas do período. Variações bruscas por setor merecem investigação clínica (perfil de gravidade, protocolos, tempo de resposta).")
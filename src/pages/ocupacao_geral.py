@@ -1,18 +1,51 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from datetime import datetime, date, timedelta
+from datetime import date
 import calendar
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from src.utils.paginas import importar
+
+# Modelos de ML (ajuste e cache compartilhados)
+from src.utils.previsao import (serie_ocupacao, agendar_previsao, prever_por_setor, horizonte_mes,
+                                resumir_projecao, media_prevista_mes, agendar_backtest, resumir_backtest)
+from src.utils.cubo import obter_cubo, diario
+from src.utils.indicadores import obter_indicadores, consolidar
+from src.utils.simulacao import simular_capacidade, CENARIOS_PADRAO, SEMENTE_PADRAO
+from src.utils import graficos
+from src.utils.desempenho import trecho
+from src.utils.resultados import buscar_kpis, buscar_projecao
+
+def calc_metrics(indicadores, ano, mes, setores, chave=None):
+    """
+    Taxa de ocupação, permanência média e giro de leito. Usa o resultado pré-calculado em lote
+    quando existe para o dataset `chave`; senão, lê da base de indicadores.
+    """
+    salvo = buscar_kpis(chave, ano, mes, setores) if chave else None
+    if salvo is not None:
+        return salvo
+    total = consolidar(indicadores, 'Internação', ano, mes, setores)
+    return total['ocupacao'], total['permanencia'], total['giro']
+
+def exibir_grafico(nome, estado, construir, linhas_origem=None):
+    """Constrói (ou reaproveita) a figura e a envia ao navegador, medindo cada etapa."""
+    with trecho("grafico.construir", grafico=nome):
+        fig = graficos.figura(nome, estado, construir, linhas_origem=linhas_origem)
+    with trecho("grafico.plotly_chart", grafico=nome):
+        st.plotly_chart(fig, use_container_width=True)
 
-# Modelos de ML
-from prophet import Prophet
+@st.fragment(run_every=1)
+def aguardar_previsoes(futuros):
+    """Acompanha os modelos em execução e recarrega a página quando todos terminarem."""
+    if all(f.done() for f in futuros):
+        st.rerun()
+    concluidos = sum(f.done() for f in futuros)
+    st.caption(f"⏳ Modelos de IA em execução: {concluidos}/{len(futuros)} concluídos.")
 
-def render_analise_descritiva(df_filtrado, df_anterior, df_internacao_completo, mes_aberto):
+def render_analise_descritiva(df_filtrado, df_anterior, df_pred, mes_aberto, estado, previsao_pendente=False):
     """
     Organiza os gráficos com explicações de Data Literacy e layout adaptável.
+    Os gráficos recebem apenas dados agregados e ficam em cache por estado de filtros (`estado`),
+    que precisa identificar o dataset e os filtros: o cache de figuras é do processo inteiro.
     """
     st.write("Analise o comportamento histórico. Se o mês estiver em aberto, o sistema incluirá a tendência para os próximos 7 dias.")
     
@@ -33,56 +66,28 @@ Se a linha estiver subindo e o gráfico de 'Balanço de Movimentação' mostrar
 **AÇÃO SUGERIDA:**
 Se a tendência apontar para cima de 98%, acione o NIR para acelerar altas administrativas e otimizar fluxos clínicos.""")
         
-        df_diario = df_filtrado.groupby('Data').agg({'Paciente/Dia': 'sum', 'Leitos-dia': 'sum'}).reset_index()
-        df_diario['Taxa %'] = (df_diario['Paciente/Dia'] / df_diario['Leitos-dia'] * 100)
-        
-        df_ant_diario = df_anterior.groupby('Data').agg({'Paciente/Dia': 'sum', 'Leitos-dia': 'sum'}).reset_index()
-        if not df_ant_diario.empty:
-            df_ant_diario['Taxa % Ant'] = (df_ant_diario['Paciente/Dia'] / df_ant_diario['Leitos-dia'] * 100)
-            df_ant_diario['Data_Comp'] = df_ant_diario['Data'].apply(lambda x: x.replace(year=df_diario['Data'].dt.year.iloc[0]))
-
-        fig = go.Figure()
-
-        if mes_aberto:
-            try:
-                df_train = df_internacao_completo.groupby('Data').agg({'Paciente/Dia': 'sum', 'Leitos-dia': 'sum'}).reset_index()
-                df_train['y'] = (df_train['Paciente/Dia'] / df_train['Leitos-dia'] * 100)
-                df_train = df_train.rename(columns={'Data': 'ds'})[['ds', 'y']]
-                df_train['ds'] = df_train['ds'].dt.tz_localize(None)
-
-                m = Prophet(yearly_seasonality=True, daily_seasonality=False, interval_width=0.8)
-                m.fit(df_train)
-                future = m.make_future_dataframe(periods=7)
-                forecast = m.predict(future)
-                df_pred = forecast[forecast['ds'] > df_train['ds'].max()]
-
-                fig.add_trace(go.Scatter(x=pd.concat([df_pred['ds'], df_pred['ds'][::-1]]),
-                                         y=pd.concat([df_pred['yhat_upper'], df_pred['yhat_lower'][::-1]]),
-                                         fill='toself', fillcolor='rgba(148, 103, 189, 0.2)',
-                                         line_color='rgba(255,255,255,0)', name='Incerteza AI', showlegend=False))
-                
-                fig.add_trace(go.Scatter(x=df_pred['ds'], y=df_pred['yhat'],
-                                         name='Tendência (IA)', line=dict(color='#9467bd', width=3, dash='dot')))
-            except:
+        # Série diária única: alimenta este gráfico e o Balanço de Movimentação
+        with trecho("descritiva.agregacao_diaria"):
+            df_diario = diario(df_filtrado)
+
+            df_ant_diario = diario(df_anterior, colunas=('Paciente/Dia', 'Leitos-dia'))
+            if not df_ant_diario.empty:
+                df_ant_diario['Data_Comp'] = df_ant_diario['Data'].apply(lambda x: x.replace(year=df_diario['Data'].dt.year.iloc[0]))
+
+        # df_pred vem do mesmo modelo usado na Projeção Final (próximos 7 dias)
+        tem_previsao = mes_aberto and df_pred is not None and not df_pred.empty
+        if mes_aberto and not tem_previsao:
+            if previsao_pendente:
+                st.info("⏳ A tendência da IA está sendo calculada e aparecerá em instantes.")
+            else:
                 st.warning("Dados insuficientes para gerar previsão AI.")
 
-        if not df_ant_diario.empty:
-            fig.add_trace(go.Scatter(x=df_ant_diario['Data_Comp'], y=df_ant_diario['Taxa % Ant'],
-                                     name='Ano Anterior', line=dict(color='gray', dash='dash'), opacity=0.4))
-
-        fig.add_trace(go.Scatter(x=df_diario['Data'], y=df_diario['Taxa %'],
-                                 name='Ocupação Atual', mode='lines+markers', line=dict(color='#1f77b4', width=3)))
-        
-        fig.add_hline(y=98, line_dash="solid", line_color="red", annotation_text="98%")
-        fig.add_hline(y=85, line_dash="dash", line_color="orange", annotation_text="85%")
-
-        fig.update_layout(hovermode="x unified", margin=dict(l=10, r=10, t=30, b=10),
-                          legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
-        fig.update_xaxes(tickformat="%d/%m", tickangle=0)
-        st.plotly_chart(fig, use_container_width=True)
+        assinatura_pred = float(df_pred['yhat'].sum()) if tem_previsao else None
+        exibir_grafico('Evolução', (estado, assinatura_pred),
+                       lambda: graficos.evolucao(df_diario, df_ant_diario, df_pred if tem_previsao else None),
+                       linhas_origem=len(df_filtrado) + len(df_anterior))
 
     # --- LÓGICA DE LAYOUT DINÂMICO PARA OS GRÁFICOS INFERIORES ---
-    # Pegamos os setores selecionados do session_state ou via parâmetro (ajuste conforme sua chamada)
     # Aqui vamos usar o dataframe filtrado para contar os setores únicos
     qtd_setores = df_filtrado['Setor'].nunique()
 
@@ -97,9 +102,11 @@ Se a tendência apontar para cima de 98%, acione o NIR para acelerar altas admin
             with st.container(border=True):
                 st.subheader("Carga por Unidade", 
                              help="""**O QUE ESTE GRÁFICO MOSTRA?** A proporção de ocupação entre os setores selecionados.""")
-                fig_tree = px.treemap(df_filtrado, path=['Setor'], values='Paciente/Dia', color_discrete_sequence=px.colors.qualitative.Safe)
-                fig_tree.update_layout(margin=dict(l=10, r=10, t=10, b=10))
-                st.plotly_chart(fig_tree, use_container_width=True)
+                # Uma linha por setor em vez de uma por setor/dia
+                exibir_grafico('Carga por Unidade', estado,
+                               lambda: graficos.treemap_setores(
+                                   df_filtrado.groupby('Setor', observed=True)['Paciente/Dia'].sum().reset_index()),
+                               linhas_origem=len(df_filtrado))
 
     # Gráfico Balanço de Movimentação (Sempre aparece)
     with col_graf2:
@@ -107,62 +114,74 @@ Se a tendência apontar para cima de 98%, acione o NIR para acelerar altas admin
             st.subheader("Balanço de Movimentação", 
                          help="""**O QUE ESTE GRÁFICO MOSTRA?** O fluxo de 'Entradas' (Internações) e 'Saídas' (Altas/Óbitos).""")
             
-            # Garantindo a soma correta da coluna 'Intern.'
-            df_mov = df_filtrado.groupby('Data').agg({
-                'Intern.': 'sum', 
-                'Saídas': 'sum',
-                'Paciente/Dia': 'sum',
-                'Leitos-dia': 'sum'
-            }).reset_index()
-            df_mov['Taxa %'] = (df_mov['Paciente/Dia'] / df_mov['Leitos-dia'] * 100)
-            
-            fig_mov = make_subplots(specs=[[{"secondary_y": True}]])
-            
-            # Barras de Entradas (Internações)
-            fig_mov.add_trace(go.Bar(
-                x=df_mov['Data'], 
-                y=df_mov['Intern.'], 
-                name='Entradas (Internações)', 
-                marker_color='#2ca02c'
-            ), secondary_y=False)
-            
-            # Barras de Saídas
-            fig_mov.add_trace(go.Bar(
-                x=df_mov['Data'], 
-                y=df_mov['Saídas'], 
-                name='Saídas (Altas/Óbitos)', 
-                marker_color='#d62728'
-            ), secondary_y=False)
-            
-            # Linha de Taxa
-            fig_mov.add_trace(go.Scatter(
-                x=df_mov['Data'], 
-                y=df_mov['Taxa %'], 
-                name='Taxa Ocupação (%)',
-                line=dict(color='#FFD700', width=4), 
-                mode='lines+markers'
-            ), secondary_y=True)
-            
-            fig_mov.update_layout(barmode='group', margin=dict(l=10, r=10, t=10, b=10), legend=dict(orientation="h"))
-            fig_mov.update_yaxes(title_text="Volume de Pacientes", secondary_y=False)
-            fig_mov.update_yaxes(title_text="Taxa %", secondary_y=True, range=[0, 110])
-            st.plotly_chart(fig_mov, use_container_width=True)
+            # Mesma série diária do gráfico de evolução (Intern., Saídas e Taxa %)
+            exibir_grafico('Balanço de Movimentação', estado, lambda: graficos.movimentacao(df_diario),
+                           linhas_origem=len(df_filtrado))
 
     # --- GRÁFICO 4: VARIABILIDADE ---
     with st.container(border=True):
         st.subheader("Variabilidade por Dia da Semana", 
                      help="""**O QUE ESTE GRÁFICO MOSTRA?** A oscilação de volume de pacientes por dia da semana.""")
-        dias_pt = {'Monday': 'Segunda-feira', 'Tuesday': 'Terça-feira', 'Wednesday': 'Quarta-feira', 
-                   'Thursday': 'Quinta-feira', 'Friday': 'Sexta-feira', 'Saturday': 'Sábado', 'Sunday': 'Domingo'}
-        df_filtrado['Dia Semana'] = df_filtrado['Data'].dt.day_name().map(dias_pt)
-        ordem_pt = ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo']
-        
-        fig_box = px.box(df_filtrado, x='Dia Semana', y='Paciente/Dia', 
-                         category_orders={'Dia Semana': ordem_pt}, color_discrete_sequence=['#1f77b4'])
-        fig_box.update_layout(margin=dict(l=10, r=10, t=10, b=10))
-        st.plotly_chart(fig_box, use_container_width=True)
+        # Quartis calculados no servidor: o navegador recebe 7 caixas, não todas as linhas
+        exibir_grafico('Variabilidade por Dia da Semana', estado,
+                       lambda: graficos.box_dia_semana(*graficos.estatisticas_box(df_filtrado['Data'], df_filtrado['Paciente/Dia'])),
+                       linhas_origem=len(df_filtrado))
+
+    if graficos.RELATORIO_PAYLOAD:
+        with st.expander("📦 Payload dos gráficos"):
+            relatorio = graficos.relatorio_payload()
+            st.dataframe(relatorio, hide_index=True, use_container_width=True)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def simular_cenarios(estado, _df_historico, horizonte, n_simulacoes):
+    """
+    Simulação Monte Carlo em cache por estado de filtros (dataset, mês e setores) e parâmetros.
+    Com a semente fixa, reruns e interações não alteram as probabilidades exibidas.
+    """
+    return simular_capacidade(_df_historico, CENARIOS_PADRAO, horizonte, n_simulacoes, semente=SEMENTE_PADRAO)
 
-def render_analise_prescritiva(df_atual):
+def render_simulacao_monte_carlo(df_historico, perc_destaque, estado):
+    """Probabilidade de romper os limites de ocupação em cada cenário de aumento de altas."""
+    st.subheader("🎲 Simulação Monte Carlo de Capacidade",
+                help="""**COMO FUNCIONA?**
+1. **Histórico:** São usados os últimos 90 dias dos setores selecionados.
+2. **Sorteio:** Cada trajetória sorteia dias reais do histórico (internações e ritmo de saídas de todos os setores no mesmo dia).
+3. **Cenários:** O ritmo de saídas é ampliado de 0% a 50% e milhares de trajetórias são simuladas para cada cenário.
+4. **Resultado:** A proporção de trajetórias cuja ocupação média passa de 98% (ou 85%) é a probabilidade exibida.""")
+
+    with st.container(border=True):
+        col_h, col_n = st.columns(2)
+        horizonte = col_h.slider("Horizonte da simulação (dias)", 7, 60, 30, step=1)
+        n_simulacoes = col_n.select_slider("Trajetórias por cenário", [500, 1000, 2000, 5000], value=2000)
+
+        with trecho("prescritiva.monte_carlo", trajetorias=n_simulacoes):
+            resultado = simular_cenarios(estado, df_historico, horizonte, n_simulacoes)
+        if resultado.empty:
+            st.warning("Histórico insuficiente para a simulação.")
+            return
+
+        go = importar('plotly.graph_objects')
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=resultado['Aumento de altas (%)'], y=resultado['P(> 98%)'] * 100,
+                                 name='P(ocupação > 98%)', mode='lines+markers', line=dict(color='red', width=3)))
+        fig.add_trace(go.Scatter(x=resultado['Aumento de altas (%)'], y=resultado['P(> 85%)'] * 100,
+                                 name='P(ocupação > 85%)', mode='lines+markers', line=dict(color='orange', width=3)))
+        fig.add_vline(x=perc_destaque, line_dash="dot", line_color="gray", annotation_text=f"{perc_destaque}%")
+        fig.update_layout(margin=dict(l=10, r=10, t=30, b=10), hovermode="x unified",
+                          xaxis_title="Aumento no volume de altas (%)", yaxis_title="Probabilidade (%)",
+                          legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+        fig.update_yaxes(range=[0, 105])
+        with trecho("grafico.plotly_chart", grafico='Monte Carlo'):
+            st.plotly_chart(fig, use_container_width=True)
+
+        st.dataframe(resultado, use_container_width=True, hide_index=True,
+                     column_config={'P(> 98%)': st.column_config.ProgressColumn(format="percent", min_value=0, max_value=1),
+                                    'P(> 85%)': st.column_config.ProgressColumn(format="percent", min_value=0, max_value=1),
+                                    'Ocupação esperada (%)': st.column_config.NumberColumn(format="%.1f"),
+                                    'Ocupação P90 (%)': st.column_config.NumberColumn(format="%.1f"),
+                                    'Dias > 98% (média)': st.column_config.NumberColumn(format="%.1f")})
+
+def render_analise_prescritiva(df_atual, df_historico, estado):
     """Implementa o Simulador Dinâmico e Conceitos Prescritivos."""
     st.write("A análise prescritiva utiliza IA e simulações para recomendar ações que otimizam a gestão de leitos e recursos.")
     
@@ -196,6 +215,8 @@ def render_analise_prescritiva(df_atual):
         col_sim2.metric("Ocupação Simulada", f"{nova_taxa:.1f}%", f"{nova_taxa - taxa_atual:.1f}%", delta_color="inverse")
         col_sim3.write(f"**Insight:** Aumentar as altas em {perc_aumento}% liberaria espaço para aproximadamente {diferenca_altas} novas internações no período.")
 
+    render_simulacao_monte_carlo(df_historico, perc_aumento, estado)
+
     # --- CONCEITOS E APLICAÇÕES ---
     st.markdown("---")
     col_presc1, col_presc2 = st.columns(2)
@@ -220,74 +241,125 @@ def render_analise_prescritiva(df_atual):
 
     st.info("💡 **O Papel do NIR:** A análise prescritiva fornece dados automatizados para que o NIR gerencie a trajetória do paciente com precisão e rapidez.")
 
+def render_projecao_setores(df_setores, ano_sel, mes_sel):
+    """
+    Projeção de fechamento por unidade: um modelo por setor, ajustados em paralelo.
+    Retorna os Futures ainda em execução.
+    """
+    with trecho("previsao.agendar_setores"):
+        futuros = prever_por_setor(df_setores, ano_sel, mes_sel)
+    linhas = []
+    for setor, futuro in futuros.items():
+        if not futuro.done():
+            proj = None
+        elif futuro.exception() is not None:
+            proj = np.nan
+        else:
+            proj = media_prevista_mes(futuro.result(), ano_sel, mes_sel)
+        linhas.append({'Setor': setor,
+                       'Projeção Final (%)': proj,
+                       'Status': "Calculando..." if proj is None else ("Sem previsão" if pd.isna(proj) else
+                                 ("Acima" if proj > 98 else ("Na Meta" if proj >= 85 else "Abaixo")))})
+
+    with st.container(border=True):
+        st.subheader("Projeção Final por Setor (AI)",
+                     help="Cada setor recebe o seu próprio modelo de previsão. Os modelos são ajustados em paralelo e a tabela é atualizada assim que ficam prontos.")
+        st.dataframe(pd.DataFrame(linhas), use_container_width=True, hide_index=True,
+                     column_config={'Projeção Final (%)': st.column_config.NumberColumn(format="%.1f%%")})
+
+    return [f for f in futuros.values() if not f.done()]
+
 def show():
     st.title("🏥 Taxa de Ocupação Hospitalar")
-    if 'df' not in st.session_state or st.session_state.df is None:
+    referencia = st.session_state.get('dataset')
+    if referencia is None:
         st.error("Por favor, carregue os dados na Página Inicial.")
         return
     
-    df = st.session_state.df
-    df_internacao = df[df['Origem'] == 'Internação'].copy()
+    chave = referencia.chave
+    # Cubo diário pré-agregado (construído uma vez por dataset); os recortes abaixo são fatias dele
+    with trecho("cubo"):
+        cubo = obter_cubo(chave, referencia)
+    with trecho("indicadores"):
+        indicadores = obter_indicadores(chave, cubo)
     
     with st.sidebar:
         st.header("⚙️ Filtros")
-        anos = sorted(df_internacao['Data'].dt.year.unique(), reverse=True)
+        anos = cubo.anos('Internação')
         ano_sel = st.selectbox("Ano de Análise", anos)
-        meses_disp = sorted(df_internacao[df_internacao['Data'].dt.year == ano_sel]['Data'].dt.month.unique())
+        meses_disp = cubo.meses('Internação', ano_sel)
         meses_nomes_pt = {1:'Janeiro', 2:'Fevereiro', 3:'Março', 4:'Abril', 5:'Maio', 6:'Junho', 7:'Julho', 8:'Agosto', 9:'Setembro', 10:'Outubro', 11:'Novembro', 12:'Dezembro'}
         mes_sel = st.selectbox("Mês de Análise", meses_disp, format_func=lambda x: meses_nomes_pt[x])
-        setores_disp = sorted(df_internacao[df_internacao['Data'].dt.year == ano_sel]['Setor'].unique())
+        setores_disp = cubo.setores('Internação', ano_sel)
         setores_sel = st.multiselect("Setores", setores_disp, default=setores_disp)
+        por_setor = st.toggle("Projeção por setor (AI)", value=False,
+                              help="No mês em aberto, ajusta um modelo por setor em paralelo, além do modelo agregado.")
 
     hoje = date.today()
     is_mes_aberto = (hoje.year == ano_sel and hoje.month == mes_sel)
-    df_atual = df_internacao[(df_internacao['Data'].dt.year == ano_sel) & (df_internacao['Data'].dt.month == mes_sel) & (df_internacao['Setor'].isin(setores_sel))]
-    df_anterior = df_internacao[(df_internacao['Data'].dt.year == ano_sel - 1) & (df_internacao['Data'].dt.month == mes_sel) & (df_internacao['Setor'].isin(setores_sel))]
+    with trecho("filtros.recorte_mes"):
+        df_atual = cubo.mes('Internação', ano_sel, mes_sel, setores_sel)
+        df_anterior = cubo.mes('Internação', ano_sel - 1, mes_sel, setores_sel)
 
     if df_atual.empty:
         st.warning("Não há dados para os filtros selecionados.")
         return
 
     # --- CÁLCULOS DOS KPIs E PROJEÇÃO AI ---
-    def calc_metrics(data):
-        if data.empty: return 0, 0, 0
-        p, l, s = data['Paciente/Dia'].sum(), data['Leitos-dia'].sum(), data['Saídas'].sum()
-        taxa = (p/l*100 if l>0 else 0)
-        perm = (p/s if s>0 else 0)
-        giro = (s/data['Leitos Ativos'].mean() if data['Leitos Ativos'].mean()>0 else 0)
-        return taxa, perm, giro
-
-    t_at, p_at, g_at = calc_metrics(df_atual)
-    t_an, p_an, g_an = calc_metrics(df_anterior)
-
-    # Lógica de Projeção Final Real com ML (Prophet)
+    with trecho("kpis"):
+        t_at, p_at, g_at = calc_metrics(indicadores, ano_sel, mes_sel, setores_sel, chave)
+        t_an, p_an, g_an = calc_metrics(indicadores, ano_sel - 1, mes_sel, setores_sel, chave)
+
+    # Lógica de Projeção Final Real com ML (motor configurado em DSH_MOTOR_PREVISAO; Prophet por padrão)
+    # Um único modelo (em cache) atende a projeção do mês e a tendência de 7 dias.
+    # O ajuste roda em segundo plano: a página é exibida e a IA é preenchida quando ficar pronta.
+    # Se o lote noturno já projetou esta combinação, o resultado salvo é usado sem ajustar nada.
     proj_fechamento = t_at
+    df_pred = None
+    pendentes = []
+    proj_pendente = False
+    salvo = buscar_projecao(chave, ano_sel, mes_sel, setores_sel) if is_mes_aberto else None
     if is_mes_aberto:
+        with trecho("previsao.serie"):
+            diario_setores = cubo.serie_diaria('Internação', setores_sel)
+    if salvo is not None:
+        df_pred, proj = salvo
+        if proj is not None:
+            proj_fechamento = proj
+    elif is_mes_aberto:
         try:
             # Treina com o histórico completo para entender a tendência do mês
-            df_proj = df_internacao[(df_internacao['Setor'].isin(setores_sel))].groupby('Data').agg({
-                'Paciente/Dia': 'sum', 'Leitos-dia': 'sum'
-            }).reset_index()
-            df_proj['y'] = (df_proj['Paciente/Dia'] / df_proj['Leitos-dia'] * 100)
-            df_proj = df_proj.rename(columns={'Data': 'ds'})[['ds', 'y']]
-            df_proj['ds'] = df_proj['ds'].dt.tz_localize(None)
-
-            m_proj = Prophet(yearly_seasonality=True, daily_seasonality=False)
-            m_proj.fit(df_proj)
-            
-            # Gera datas até o último dia do mês selecionado
-            ultimo_dia_mes = calendar.monthrange(ano_sel, mes_sel)[1]
-            data_fim_mes = datetime(ano_sel, mes_sel, ultimo_dia_mes)
-            dias_para_prever = (data_fim_mes - df_proj['ds'].max()).days
+            df_proj = serie_ocupacao(diario_setores)
+
+            # Gera datas até o último dia do mês selecionado (no mínimo 7 dias para o gráfico)
+            ultimo_real, dias_para_prever, periodos = horizonte_mes(df_proj, ano_sel, mes_sel)
+            with trecho("previsao.agendar"):
+                futuro = agendar_previsao(df_proj, periodos)
             
-            if dias_para_prever > 0:
-                future_proj = m_proj.make_future_dataframe(periods=dias_para_prever)
-                forecast_proj = m_proj.predict(future_proj)
+            if not futuro.done():
+                proj_pendente = True
+                pendentes.append(futuro)
+            else:
                 # A projeção final é a média esperada de todo o mês (real + previsto)
-                proj_fechamento = forecast_proj[forecast_proj['ds'].dt.month == mes_sel]['yhat'].mean()
+                df_pred, proj = resumir_projecao(futuro.result(), ultimo_real, ano_sel, mes_sel, dias_para_prever)
+                if proj is not None:
+                    proj_fechamento = proj
         except:
             proj_fechamento = t_at # Fallback para média atual se a IA falhar
 
+    # Acurácia da projeção nos meses anteriores: backtest em segundo plano, calculado uma vez por série
+    # Só um backtest em andamento entra em `pendentes`; concluído ou com falha, a página não espera por ele
+    backtest = None
+    backtest_pendente = False
+    if is_mes_aberto:
+        with trecho("previsao.backtest"):
+            futuro_bt = agendar_backtest(diario_setores)
+        if not futuro_bt.done():
+            backtest_pendente = True
+            pendentes.append(futuro_bt)
+        elif futuro_bt.exception() is None:
+            backtest = futuro_bt.result()
+
     # --- EXIBIÇÃO DOS SCORECARDS COM TOOLTIPS ---
     st.header("📈 Scorecards de Performance")
     cols_n = 6 if is_mes_aberto else 5
@@ -313,11 +385,35 @@ def show():
                      help="Contagem regressiva de dias corridos para o encerramento do mês atual.")
 
     if is_mes_aberto:
-        k_cols[5].metric("Projeção Final (AI)", f"{proj_fechamento:.1f}%", 
-                         help="""**PROJEÇÃO COM INTELIGÊNCIA ARTIFICIAL: ** Utiliza o modelo Prophet para analisar a tendência dos dias que já passaram e prever o comportamento até o último dia do mês. Indica com qual Taxa de Ocupação o hospital provavelmente fechará o mês se o padrão atual e a sazonalidade se mantiverem.""")
-
-    with st.expander("📊 Análise Descritiva & Tendências", expanded=True):
-        render_analise_descritiva(df_atual, df_anterior, df_internacao, is_mes_aberto)
-
-    with st.expander("💡 Análise Prescritiva", expanded=False):
-        render_analise_prescritiva(df_atual)
\ No newline at end of file
+        k_cols[5].metric("Projeção Final (AI)", "⏳" if proj_pendente else f"{proj_fechamento:.1f}%", 
+                         help="""**PROJEÇÃO COM INTELIGÊNCIA ARTIFICIAL: ** Utiliza o motor de previsão configurado (Prophet por padrão, ou o Holt-Winters rápido) para analisar a tendência dos dias que já passaram e prever o comportamento até o último dia do mês. Indica com qual Taxa de Ocupação o hospital provavelmente fechará o mês se o padrão atual e a sazonalidade se mantiverem.""")
+        acuracia = resumir_backtest(backtest, hoje.day)
+        if acuracia is not None:
+            k_cols[5].caption(f"🎯 Erro médio de ±{acuracia['mae']:.1f} p.p. nos últimos {acuracia['meses']} meses "
+                              f"(projeção feita no dia {acuracia['origem']})")
+        elif backtest_pendente:
+            k_cols[5].caption("⏳ Avaliando a acurácia da projeção...")
+
+    if backtest is not None and not backtest.empty:
+        with st.expander("🎯 Acurácia da Projeção Final (backtest)", expanded=False):
+            st.write("Projeções refeitas com os dados disponíveis até o dia de origem de cada mês já fechado, comparadas com a ocupação real do mês.")
+            st.dataframe(backtest, use_container_width=True, hide_index=True,
+                         column_config={c: st.column_config.NumberColumn(format="%.1f")
+                                        for c in ('Projeção (%)', 'Real (%)', 'Erro (p.p.)')})
+
+    if is_mes_aberto and por_setor:
+        df_setores = cubo.periodo('Internação', None, None, setores_sel)
+        pendentes += render_projecao_setores(df_setores, ano_sel, mes_sel)
+
+    with st.expander("📊 Análise Descritiva & Tendências", expanded=True), trecho("descritiva"):
+        render_analise_descritiva(df_atual, df_anterior, df_pred, is_mes_aberto,
+                                  (chave, ano_sel, mes_sel, tuple(setores_sel)), previsao_pendente=proj_pendente)
+
+    with st.expander("💡 Análise Prescritiva", expanded=False), trecho("prescritiva"):
+        # Últimos 90 dias até o fim do mês analisado alimentam a simulação
+        fim_mes = pd.Timestamp(ano_sel, mes_sel, 1) + pd.offsets.MonthBegin(1)
+        df_historico = cubo.periodo('Internação', fim_mes - pd.Timedelta(days=90), fim_mes, setores_sel, incluir_fim=False)
+        render_analise_prescritiva(df_atual, df_historico, (chave, ano_sel, mes_sel, tuple(setores_sel)))
+
+    if pendentes:
+        aguardar_previsoes(pendentes)
\ No newline at end of file
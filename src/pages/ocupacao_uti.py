@@ -0,0 +1,6 @@
+from src.pages.modelo_indicador import show_indicador
+
+def show():
+    show_indicador("🫀 Taxa de Ocupação da UTI", 'ocupacao', padrao_setor=r"UTI|Terapia Intensiva",
+                   secundarios=('permanencia', 'giro', 'substituicao'),
+                   descricao="Uso da capacidade instalada dos leitos de terapia intensiva. A meta de segurança é manter a ocupação entre 85% e 98%.")
@@ -0,0 +1,6 @@
+from src.pages.modelo_indicador import show_indicador
+
+def show():
+    show_indicador("🔪 Tempo de Permanência em Leitos Cirúrgicos", 'permanencia', padrao_setor=r"Cir[uú]rg",
+                   secundarios=('giro', 'ocupacao', 'substituicao'),
+                   descricao="Média de dias que o paciente cirúrgico ocupa o leito. Permanências longas reduzem o giro e atrasam a agenda de eletivas.")
@@ -0,0 +1,6 @@
+from src.pages.modelo_indicador import show_indicador
+
+def show():
+    show_indicador("🩺 Tempo de Permanência em Leitos de Clínica Médica", 'permanencia', padrao_setor=r"Cl[ií]nica M[eé]dica",
+                   secundarios=('giro', 'ocupacao', 'substituicao'),
+                   descricao="Média de dias que o paciente clínico ocupa o leito. É o principal alvo das ações de desospitalização conduzidas pelo NIR.")
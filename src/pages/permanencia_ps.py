@@ -0,0 +1,6 @@
+from src.pages.modelo_indicador import show_indicador
+
+def show():
+    show_indicador("🚑 Tempo de Permanência no Pronto Socorro", 'permanencia', padrao_setor=r"Pronto[ -]?Socorro|\bPS\b|Emerg",
+                   secundarios=('ocupacao', 'giro'), origem='Pronto Socorro',
+                   descricao="Média de dias que o paciente permanece no Pronto Socorro. Valores altos indicam falta de leitos de retaguarda para internação.")
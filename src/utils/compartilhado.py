@@ -0,0 +1,135 @@
+import os
+import threading
+import uuid
+import weakref
+from pathlib import Path
+
+import pandas as pd
+
+from src.utils.ingest import VERSAO_SCHEMA
+
+# Arquivos Arrow (IPC, sem compressão) mapeados em memória: as colunas numéricas e de data
+# do DataFrame apontam direto para o mapeamento, que o sistema operacional compartilha
+COMPARTILHADO_DIR = Path(os.environ.get("DSH_CACHE_DIR", ".cache")) / "compartilhado"
+
+# chave -> {'df': DataFrame somente leitura, 'refs': sessões que o usam, 'bytes': tamanho do arquivo}
+_entradas = {}
+# RLock: a liberação roda no coletor de lixo e pode disparar com o lock já tomado pela mesma thread
+_lock = threading.RLock()
+
+
+class Referencia:
+    """
+    Handle que a sessão guarda para um dataset do repositório compartilhado.
+    Quando a sessão termina (ou troca de dataset) o handle é coletado e a referência é liberada;
+    o dataset sai da memória quando nenhuma sessão o usa mais.
+    """
+    __slots__ = ('chave', '__weakref__')
+    em_memoria = True
+
+    def __init__(self, chave):
+        self.chave = chave
+        weakref.finalize(self, _liberar, chave)
+
+    @property
+    def df(self):
+        return _entradas[self.chave]['df']
+
+    @property
+    def linhas(self):
+        return len(self.df)
+
+    def previa(self, n=5):
+        return self.df.head(n)
+
+
+def _caminho(chave):
+    return COMPARTILHADO_DIR / f"{chave}.v{VERSAO_SCHEMA}.arrow"
+
+
+def _gravar(caminho, df):
+    import pyarrow as pa
+
+    COMPARTILHADO_DIR.mkdir(parents=True, exist_ok=True)
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    temporario = caminho.with_suffix(f'.{uuid.uuid4().hex}.tmp')
+    with pa.OSFile(str(temporario), 'wb') as arquivo, pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    os.replace(temporario, caminho)
+
+
+def _mapear(caminho):
+    """
+    DataFrame cujas colunas numéricas e de data são visões (somente leitura) do arquivo mapeado,
+    e o tamanho do mapeamento (o arquivo pode ser removido logo depois por outra sessão).
+    """
+    import pyarrow as pa
+
+    mapa = pa.memory_map(str(caminho))
+    tabela = pa.ipc.open_file(mapa).read_all()
+    # split_blocks evita consolidar colunas em blocos novos, preservando a cópia zero
+    return tabela.to_pandas(split_blocks=True), mapa.size()
+
+
+def _registrar(chave):
+    entrada = _entradas[chave]
+    entrada['refs'] += 1
+    return Referencia(chave)
+
+
+def obter(chave):
+    """Handle para o dataset já presente no repositório, ou None."""
+    with _lock:
+        if chave in _entradas:
+            return _registrar(chave)
+    return None
+
+
+def abrir(chave, carregar):
+    """
+    Handle para o dataset `chave`. Se nenhuma sessão o tem aberto, `carregar()` produz o
+    DataFrame (só quando o arquivo Arrow ainda não existe), que é gravado e mapeado em memória.
+    """
+    referencia = obter(chave)
+    if referencia is not None:
+        return referencia
+
+    caminho = _caminho(chave)
+    if not caminho.exists():
+        _gravar(caminho, carregar())
+    try:
+        df, tamanho = _mapear(caminho)
+    except FileNotFoundError:
+        # Removido pela liberação da última sessão entre a verificação e o mapeamento
+        _gravar(caminho, carregar())
+        df, tamanho = _mapear(caminho)
+
+    with _lock:
+        # Outra sessão pode ter aberto o mesmo dataset enquanto este era carregado
+        if chave not in _entradas:
+            _entradas[chave] = {'df': df, 'refs': 0, 'bytes': tamanho}
+        return _registrar(chave)
+
+
+def _liberar(chave):
+    with _lock:
+        entrada = _entradas.get(chave)
+        if entrada is None:
+            return
+        entrada['refs'] -= 1
+        if entrada['refs'] > 0:
+            return
+        del _entradas[chave]
+    try:
+        _caminho(chave).unlink(missing_ok=True)
+    except OSError:
+        # Windows não remove arquivos ainda mapeados; o próximo `abrir` reaproveita o arquivo
+        pass
+
+
+def resumo():
+    """Datasets abertos no processo, com quantas sessões usam cada um."""
+    with _lock:
+        linhas = [{'Dataset': chave[:12], 'Sessões': e['refs'], 'Linhas': len(e['df']),
+                   'Arquivo (MB)': round(e['bytes'] / 1024 ** 2, 2)} for chave, e in _entradas.items()]
+    return pd.DataFrame(linhas, columns=['Dataset', 'Sessões', 'Linhas', 'Arquivo (MB)'])
@@ -0,0 +1,243 @@
+import importlib.util
+import os
+import threading
+
+import pandas as pd
+
+# Motor de consulta sobre os Parquet do dataset: 'pandas' (padrão) mantém o cubo em memória;
+# 'arrow', 'duckdb' e 'polars' empurram filtros e somas para o motor colunar
+MOTOR_CONSULTA = os.environ.get("DSH_MOTOR_CONSULTA", "pandas")
+
+# Colunas calculadas a partir de Data dentro do motor
+DERIVADAS = ('Ano', 'Mes')
+
+
+def _ts(valor):
+    return None if valor is None else pd.Timestamp(valor)
+
+
+def esquema_unificado(fontes):
+    """
+    Schema comum aos Parquet do dataset. Partições do histórico gravadas com tipos diferentes
+    (ex.: int8 num mês, int16 ou float32 em outro) são promovidas ao tipo mais largo; sem isso o
+    pyarrow.dataset usa o schema do primeiro arquivo e falha ao converter os demais.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquemas = []
+    for fonte in fontes:
+        # Categorias viram texto: o dicionário e o tipo dos índices mudam de um arquivo para outro
+        campos = [pa.field(c.name, c.type.value_type if pa.types.is_dictionary(c.type) else c.type)
+                  for c in pq.read_schema(str(fonte))]
+        esquemas.append(pa.schema(campos))
+    return pa.unify_schemas(esquemas, promote_options='permissive')
+
+
+def _abrir_dataset(fontes):
+    import pyarrow.dataset as ds
+
+    fontes = [str(f) for f in fontes]
+    return ds.dataset(fontes, format='parquet', schema=esquema_unificado(fontes))
+
+
+class ConsultaArrow:
+    """pyarrow.dataset: filtros aplicados na leitura (pula row groups) e group_by em Arrow."""
+    nome = 'arrow'
+    modulo = 'pyarrow'
+
+    def __init__(self):
+        # A descoberta do dataset lê os metadados dos arquivos; é feita uma vez por conjunto de fontes
+        self._datasets = {}
+
+    def _dataset(self, fontes):
+        chave = tuple(str(f) for f in fontes)
+        if chave not in self._datasets:
+            self._datasets[chave] = _abrir_dataset(chave)
+        return self._datasets[chave]
+
+    def agregar(self, fontes, por, colunas, origem=None, inicio=None, fim=None, setores=None, incluir_fim=True):
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+
+        condicoes = []
+        if origem is not None:
+            condicoes.append(ds.field('Origem') == origem)
+        if inicio is not None:
+            condicoes.append(ds.field('Data') >= _ts(inicio))
+        if fim is not None:
+            condicoes.append(ds.field('Data') <= _ts(fim) if incluir_fim else ds.field('Data') < _ts(fim))
+        if setores is not None:
+            condicoes.append(ds.field('Setor').isin([str(s) for s in setores]))
+        filtro = None
+        for condicao in condicoes:
+            filtro = condicao if filtro is None else filtro & condicao
+
+        lidas = list(dict.fromkeys(['Data' if c in DERIVADAS else c for c in por] + list(colunas)))
+        tabela = self._dataset(fontes).to_table(columns=lidas, filter=filtro)
+        for coluna in por:
+            if coluna in DERIVADAS:
+                tabela = tabela.append_column(coluna, (pc.year if coluna == 'Ano' else pc.month)(tabela['Data']))
+
+        agregado = tabela.group_by(list(por)).aggregate([(c, 'sum') for c in colunas] + [([], 'count_all')])
+        nomes = {f'{c}_sum': c for c in colunas}
+        nomes['count_all'] = 'Linhas'
+        return agregado.to_pandas().rename(columns=nomes)
+
+
+def _q(coluna):
+    return '"' + coluna.replace('"', '""') + '"'
+
+
+class ConsultaDuckDB:
+    """DuckDB lendo os Parquet direto (predicados e agregação executados no scan)."""
+    nome = 'duckdb'
+    modulo = 'duckdb'
+
+    def __init__(self):
+        # Uma conexão por thread: cada sessão do Streamlit consulta na sua própria thread
+        self._local = threading.local()
+
+    def _conexao(self):
+        import duckdb
+
+        if not hasattr(self._local, 'con'):
+            self._local.con = duckdb.connect()
+        return self._local.con
+
+    def agregar(self, fontes, por, colunas, origem=None, inicio=None, fim=None, setores=None, incluir_fim=True):
+        expressoes = {'Ano': 'year("Data")', 'Mes': 'month("Data")'}
+        selecao = ([f'{expressoes.get(c, _q(c))} AS {_q(c)}' for c in por]
+                   + [f'sum({_q(c)}) AS {_q(c)}' for c in colunas] + ['count(*) AS "Linhas"'])
+
+        condicoes, parametros = [], []
+        if origem is not None:
+            condicoes.append('"Origem" = ?')
+            parametros.append(origem)
+        if inicio is not None:
+            condicoes.append('"Data" >= ?')
+            parametros.append(_ts(inicio).to_pydatetime())
+        if fim is not None:
+            condicoes.append('"Data" <= ?' if incluir_fim else '"Data" < ?')
+            parametros.append(_ts(fim).to_pydatetime())
+        if setores is not None:
+            setores = [str(s) for s in setores]
+            condicoes.append(f'"Setor" IN ({", ".join("?" * len(setores))})' if setores else 'FALSE')
+            parametros += setores
+
+        arquivos = ", ".join("'" + str(f).replace("'", "''") + "'" for f in fontes)
+        # union_by_name promove tipos que diferem entre as partições do histórico
+        sql = f"SELECT {', '.join(selecao)} FROM read_parquet([{arquivos}], union_by_name=true)"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        sql += " GROUP BY ALL"
+        return self._conexao().execute(sql, parametros).df()
+
+
+class ConsultaPolars:
+    """Polars lazy (scan_parquet): filtros e group_by otimizados antes da leitura."""
+    nome = 'polars'
+    modulo = 'polars'
+
+    def agregar(self, fontes, por, colunas, origem=None, inicio=None, fim=None, setores=None, incluir_fim=True):
+        import polars as pl
+
+        # Uma leitura por arquivo, concatenadas com promoção de tipos (as partições podem diferir)
+        consulta = pl.concat([pl.scan_parquet(str(f)).with_columns(pl.col('Setor', 'Origem').cast(pl.Utf8))
+                              for f in fontes], how='vertical_relaxed')
+        if origem is not None:
+            consulta = consulta.filter(pl.col('Origem').cast(pl.Utf8) == origem)
+        if inicio is not None:
+            consulta = consulta.filter(pl.col('Data') >= _ts(inicio).to_pydatetime())
+        if fim is not None:
+            limite = _ts(fim).to_pydatetime()
+            consulta = consulta.filter(pl.col('Data') <= limite if incluir_fim else pl.col('Data') < limite)
+        if setores is not None:
+            consulta = consulta.filter(pl.col('Setor').cast(pl.Utf8).is_in([str(s) for s in setores]))
+        if 'Ano' in por:
+            consulta = consulta.with_columns(pl.col('Data').dt.year().alias('Ano'))
+        if 'Mes' in por:
+            consulta = consulta.with_columns(pl.col('Data').dt.month().alias('Mes'))
+
+        agregado = consulta.group_by(list(por)).agg([pl.col(c).sum() for c in colunas] + [pl.len().alias('Linhas')])
+        return agregado.collect().to_pandas()
+
+
+MOTORES_CONSULTA = {'arrow': ConsultaArrow, 'duckdb': ConsultaDuckDB, 'polars': ConsultaPolars}
+
+
+def motor_consulta_disponivel(nome):
+    return importlib.util.find_spec(MOTORES_CONSULTA[nome].modulo) is not None
+
+
+def obter_motor_consulta(nome=None):
+    """
+    Instancia o motor de consulta configurado, ou None para manter o cubo pandas em memória.
+    Sem DuckDB/Polars instalados, recorre ao pyarrow (dependência do projeto).
+    """
+    nome = nome or MOTOR_CONSULTA
+    if nome == 'pandas':
+        return None
+    if nome not in MOTORES_CONSULTA:
+        raise ValueError(f"Motor de consulta desconhecido: {nome}. Opções: pandas, {', '.join(MOTORES_CONSULTA)}")
+    if not motor_consulta_disponivel(nome):
+        nome = 'arrow'
+    return MOTORES_CONSULTA[nome]()
+
+
+def fontes_do_dataset(chave):
+    """Arquivos Parquet que contêm o dataset `chave` (cache do upload ou histórico incremental), ou None."""
+    from src.utils.ingest import caminho_cache, hash_historico, particoes_historico
+
+    if not chave:
+        return None
+    caminho = caminho_cache(chave)
+    if caminho.exists():
+        return [caminho]
+    if chave == hash_historico():
+        return particoes_historico() or None
+    return None
+
+
+class DatasetParquet:
+    """
+    Handle da sessão para um dataset consultado direto nos Parquet (motor de consulta colunar).
+    Nada fica em memória: as linhas vêm dos metadados e a prévia lê só o início do primeiro arquivo.
+    """
+    __slots__ = ('chave', 'fontes')
+    em_memoria = False
+
+    def __init__(self, chave, fontes):
+        self.chave = chave
+        self.fontes = list(fontes)
+
+    @property
+    def linhas(self):
+        import pyarrow.parquet as pq
+        return sum(pq.read_metadata(str(f)).num_rows for f in self.fontes)
+
+    def previa(self, n=5):
+        return _abrir_dataset(self.fontes).head(n).to_pandas()
+
+    @property
+    def df(self):
+        """Leitura completa dos Parquet, para quem precisar das linhas brutas (as páginas não usam)."""
+        from src.utils.ingest import tipar_colunas
+        return tipar_colunas(ler_filtrado(self.fontes))
+
+
+def ler_filtrado(fontes, origens=None, inicio=None, fim=None):
+    """Linhas brutas do recorte pedido, lendo do Parquet só o que passa nos filtros."""
+    import pyarrow.dataset as ds
+
+    filtro = None
+    condicoes = []
+    if origens is not None:
+        condicoes.append(ds.field('Origem').isin([str(o) for o in origens]))
+    if inicio is not None:
+        condicoes.append(ds.field('Data') >= _ts(inicio))
+    if fim is not None:
+        condicoes.append(ds.field('Data') <= _ts(fim))
+    for condicao in condicoes:
+        filtro = condicao if filtro is None else filtro & condicao
+    return _abrir_dataset(fontes).to_table(filter=filtro).to_pandas()
@@ -0,0 +1,184 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from src.utils.consultas import fontes_do_dataset, obter_motor_consulta
+
+COLUNAS_SOMA = ['Paciente/Dia', 'Leitos-dia', 'Intern.', 'Saídas', 'Altas', 'Óbitos', 'Leitos Ativos']
+CHAVES_MENSAIS = ['Origem', 'Ano', 'Mes', 'Setor']
+
+
+class CuboOcupacao:
+    """
+    Movimentação diária somada por (Origem, Data, Setor), montada uma única vez por dataset.
+
+    As linhas ficam ordenadas por Origem e Data, com Ano/Mes já materializados, de modo que
+    recortes de mês ou de ano são apenas fatias por busca binária nas datas.
+    A coluna 'Linhas' guarda quantos registros originais formaram cada linha, para que
+    médias (ex.: Leitos Ativos) continuem iguais às calculadas sobre os dados brutos.
+    """
+
+    def __init__(self, df):
+        somas = [c for c in COLUNAS_SOMA if c in df.columns]
+        cubo = (df.groupby(['Origem', 'Data', 'Setor'], observed=True, sort=True)
+                  .agg(**{c: (c, 'sum') for c in somas}, Linhas=(somas[0], 'size'))
+                  .reset_index())
+        cubo['Ano'] = cubo['Data'].dt.year.astype('int16')
+        cubo['Mes'] = cubo['Data'].dt.month.astype('int8')
+        self.dados = cubo
+
+        # Intervalo [início, fim) de cada Origem e as datas ordenadas dentro dele
+        self._blocos = {}
+        origens = cubo['Origem'].to_numpy()
+        datas = cubo['Data'].to_numpy()
+        limites = np.flatnonzero(origens[1:] != origens[:-1]) + 1
+        for ini, fim in zip(np.r_[0, limites], np.r_[limites, len(cubo)]):
+            if fim > ini:
+                self._blocos[origens[ini]] = (ini, fim, datas[ini:fim])
+
+    def origem(self, origem):
+        """Todas as linhas de uma Origem (fatia, sem cópia)."""
+        if origem not in self._blocos:
+            return self.dados.iloc[0:0]
+        ini, fim, _ = self._blocos[origem]
+        return self.dados.iloc[ini:fim]
+
+    def periodo(self, origem, inicio, fim, setores=None, incluir_fim=True):
+        """
+        Linhas da Origem com inicio <= Data <= fim (Data < fim com incluir_fim=False; None = sem limite),
+        opcionalmente restritas aos setores.
+        """
+        if origem not in self._blocos:
+            return self.dados.iloc[0:0]
+        ini, _, datas = self._blocos[origem]
+        a = 0 if inicio is None else datas.searchsorted(pd.Timestamp(inicio).to_datetime64().astype(datas.dtype), side='left')
+        b = len(datas) if fim is None else datas.searchsorted(pd.Timestamp(fim).to_datetime64().astype(datas.dtype),
+                                                               side='right' if incluir_fim else 'left')
+        fatia = self.dados.iloc[ini + a:ini + b]
+        if setores is not None:
+            fatia = fatia[fatia['Setor'].isin(setores)]
+        return fatia
+
+    def mes(self, origem, ano, mes, setores=None):
+        # Limite exclusivo no início do mês seguinte: inclui registros com hora no último dia
+        inicio = pd.Timestamp(ano, mes, 1)
+        return self.periodo(origem, inicio, inicio + pd.offsets.MonthBegin(1), setores, incluir_fim=False)
+
+    def ano(self, origem, ano, setores=None):
+        return self.periodo(origem, pd.Timestamp(ano, 1, 1), pd.Timestamp(ano + 1, 1, 1), setores, incluir_fim=False)
+
+    def anos(self, origem):
+        return sorted(self.origem(origem)['Ano'].unique().tolist(), reverse=True)
+
+    def meses(self, origem, ano):
+        return sorted(self.ano(origem, ano)['Mes'].unique().tolist())
+
+    def setores(self, origem, ano):
+        return sorted(self.ano(origem, ano)['Setor'].unique().tolist())
+
+    def serie_diaria(self, origem, setores=None, colunas=('Paciente/Dia', 'Leitos-dia')):
+        """Soma diária de todo o histórico da Origem (entrada de serie_ocupacao)."""
+        fatia = self.periodo(origem, None, None, setores)
+        return fatia.groupby('Data').agg({c: 'sum' for c in colunas}).reset_index()
+
+    def somas_mensais(self):
+        """Somas por (Origem, Ano, Mes, Setor), base dos indicadores."""
+        componentes = [c for c in COLUNAS_SOMA + ['Linhas'] if c in self.dados.columns]
+        return self.dados.groupby(CHAVES_MENSAIS, observed=True, sort=True)[componentes].sum().reset_index()
+
+
+class CuboParquet(CuboOcupacao):
+    """
+    Mesma interface do CuboOcupacao, mas sem carregar o dataset: cada recorte é uma consulta
+    sobre os Parquet, com os filtros de Origem, período e setores e a soma por dia/setor
+    executados no motor colunar. A página recebe só o resultado agregado; consultas
+    repetidas (reruns) ficam em um LRU pequeno.
+    """
+    LIMITE_CONSULTAS = 128
+
+    def __init__(self, fontes, motor):
+        import pyarrow.parquet as pq
+
+        self.fontes = [str(f) for f in fontes]
+        self.motor = motor
+        nomes = pq.read_schema(self.fontes[0]).names
+        self.colunas = [c for c in COLUNAS_SOMA if c in nomes]
+        self._consultas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _agregar(self, por, colunas, origem=None, inicio=None, fim=None, setores=None, incluir_fim=True):
+        chave = (tuple(por), tuple(colunas), origem, inicio, fim, incluir_fim,
+                 None if setores is None else tuple(sorted(map(str, setores))))
+        with self._lock:
+            if chave in self._consultas:
+                self._consultas.move_to_end(chave)
+                return self._consultas[chave]
+
+        resultado = self.motor.agregar(self.fontes, por, colunas, origem, inicio, fim, setores, incluir_fim)
+        for coluna in ('Origem', 'Setor'):
+            if coluna in resultado.columns:
+                resultado[coluna] = resultado[coluna].astype(str).astype('category')
+        if 'Data' in resultado.columns:
+            resultado['Data'] = pd.to_datetime(resultado['Data'])
+            resultado['Ano'] = resultado['Data'].dt.year.astype('int16')
+            resultado['Mes'] = resultado['Data'].dt.month.astype('int8')
+        else:
+            for coluna, tipo in (('Ano', 'int16'), ('Mes', 'int8')):
+                if coluna in resultado.columns:
+                    resultado[coluna] = resultado[coluna].astype(tipo)
+        resultado = resultado.sort_values(list(por), ignore_index=True)
+
+        with self._lock:
+            self._consultas[chave] = resultado
+            while len(self._consultas) > self.LIMITE_CONSULTAS:
+                self._consultas.popitem(last=False)
+        return resultado
+
+    def origem(self, origem):
+        return self.periodo(origem, None, None)
+
+    def periodo(self, origem, inicio, fim, setores=None, incluir_fim=True):
+        inicio = None if inicio is None else pd.Timestamp(inicio)
+        fim = None if fim is None else pd.Timestamp(fim)
+        return self._agregar(['Origem', 'Data', 'Setor'], self.colunas, origem, inicio, fim, setores, incluir_fim)
+
+    def anos(self, origem):
+        return sorted(self._agregar(['Ano'], [], origem)['Ano'].tolist(), reverse=True)
+
+    def meses(self, origem, ano):
+        return sorted(self._agregar(['Mes'], [], origem, pd.Timestamp(ano, 1, 1), pd.Timestamp(ano + 1, 1, 1),
+                                    incluir_fim=False)['Mes'].tolist())
+
+    def setores(self, origem, ano):
+        return sorted(self._agregar(['Setor'], [], origem, pd.Timestamp(ano, 1, 1), pd.Timestamp(ano + 1, 1, 1),
+                                    incluir_fim=False)['Setor'].astype(str).tolist())
+
+    def serie_diaria(self, origem, setores=None, colunas=('Paciente/Dia', 'Leitos-dia')):
+        return self._agregar(['Data'], list(colunas), origem, setores=setores)[['Data'] + list(colunas)]
+
+    def somas_mensais(self):
+        return self._agregar(CHAVES_MENSAIS, self.colunas)
+
+
+def diario(fatia, colunas=('Paciente/Dia', 'Leitos-dia', 'Intern.', 'Saídas')):
+    """Soma diária da fatia do cubo, com a Taxa % já calculada."""
+    df_dia = fatia.groupby('Data').agg({c: 'sum' for c in colunas}).reset_index()
+    df_dia['Taxa %'] = (df_dia['Paciente/Dia'] / df_dia['Leitos-dia'] * 100)
+    return df_dia
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def obter_cubo(chave, _referencia):
+    """
+    Cubo do dataset identificado por `chave` (construído uma vez e compartilhado).
+    Com DSH_MOTOR_CONSULTA diferente de 'pandas' e o dataset salvo em Parquet, as consultas vão ao disco
+    e o DataFrame do handle `_referencia` nem é lido.
+    """
+    motor = obter_motor_consulta()
+    fontes = fontes_do_dataset(chave) if motor is not None else None
+    if fontes:
+        return CuboParquet(fontes, motor)
+    return CuboOcupacao(_referencia.df)
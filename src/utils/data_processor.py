@@ -1,9 +1,14 @@
+import pandas as pd
 import streamlit as st
 
+from src.utils.consultas import fontes_do_dataset, ler_filtrado, obter_motor_consulta
+from src.utils.desempenho import trecho
+
 def filtrar_dados(df):
     """
     Cria a interface de filtros na sidebar ou no topo da página
     e retorna o dataframe filtrado.
+    Com um motor de consulta configurado, o recorte é lido do Parquet com os filtros aplicados na leitura.
     """
     st.sidebar.subheader("Filtros Globais")
     
@@ -23,9 +28,17 @@ def filtrar_dados(df):
     selecao_origem = st.sidebar.multiselect("Origem/Tipo de Setor", origens, default=origens)
     
     # Aplicação dos filtros
-    mask = (df['Origem'].isin(selecao_origem))
-    
-    if len(data_range) == 2:
-        mask &= (df['Data'] >= pd.Timestamp(data_range[0])) & (df['Data'] <= pd.Timestamp(data_range[1]))
-    
-    return df[mask]
\ No newline at end of file
+    referencia = st.session_state.get('dataset')
+    fontes = fontes_do_dataset(referencia and referencia.chave) if obter_motor_consulta() is not None else None
+    if fontes:
+        inicio, fim = (data_range if len(data_range) == 2 else (None, None))
+        with trecho("filtros_globais.parquet", fontes=len(fontes)):
+            return ler_filtrado(fontes, selecao_origem, inicio, fim)
+
+    with trecho("filtros_globais.mascara", linhas=len(df)):
+        mask = (df['Origem'].isin(selecao_origem))
+
+        if len(data_range) == 2:
+            mask &= (df['Data'] >= pd.Timestamp(data_range[0])) & (df['Data'] <= pd.Timestamp(data_range[1]))
+
+        return df[mask]
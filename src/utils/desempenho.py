@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from src.utils.compartilhado import resumo as resumo_compartilhado
+
+# Painel na sidebar só quando DSH_PAINEL_DESEMPENHO=1; DSH_LOG_DESEMPENHO=<arquivo> grava um JSON por rerun
+PAINEL_ATIVO = os.environ.get("DSH_PAINEL_DESEMPENHO") == "1"
+ARQUIVO_LOG = os.environ.get("DSH_LOG_DESEMPENHO")
+HISTORICO_RERUNS = 20
+
+# Cada rerun roda na thread do script da sessão; trechos fora dela (ex.: ajustes no pool
+# de previsão) vão para um registro do processo
+_local = threading.local()
+_fora_rerun = deque(maxlen=200)
+_lock = threading.Lock()
+_memoria_df = {}
+
+
+def iniciar_rerun(pagina):
+    """Abre o registro de trechos do rerun atual."""
+    _local.rerun = {'pagina': pagina, 'inicio': time.perf_counter(),
+                    'data': datetime.now().isoformat(timespec='seconds'), 'trechos': []}
+    _local.nivel = 0
+
+
+@contextmanager
+def trecho(nome, **atributos):
+    """Mede o tempo de um trecho do caminho quente e o registra no rerun corrente."""
+    rerun = getattr(_local, 'rerun', None)
+    nivel = getattr(_local, 'nivel', 0)
+    _local.nivel = nivel + 1
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fim = time.perf_counter()
+        _local.nivel = nivel
+        registro = {'trecho': nome, 'nivel': nivel, 'duracao_ms': round((fim - inicio) * 1000, 3), **atributos}
+        if rerun is not None:
+            registro['inicio_ms'] = round((inicio - rerun['inicio']) * 1000, 3)
+            rerun['trechos'].append(registro)
+        else:
+            registro['data'] = datetime.now().isoformat(timespec='seconds')
+            registro['thread'] = threading.current_thread().name
+            with _lock:
+                _fora_rerun.append(registro)
+
+
+def memoria_df(df, chave):
+    """Memória (deep) de cada coluna do dataframe da sessão, calculada uma vez por dataset."""
+    if chave not in _memoria_df:
+        uso = df.memory_usage(deep=True, index=True)
+        if len(_memoria_df) >= 8:
+            _memoria_df.pop(next(iter(_memoria_df)))
+        _memoria_df[chave] = {'linhas': len(df), 'total_mb': round(uso.sum() / 1024 ** 2, 3),
+                              'colunas_mb': {str(c): round(v / 1024 ** 2, 3) for c, v in uso.items()}}
+    return _memoria_df[chave]
+
+
+def finalizar_rerun():
+    """
+    Fecha o rerun corrente: duração total, memória do dataset da sessão e histórico
+    dos últimos reruns (em st.session_state). Grava a linha JSON se o log estiver ativo.
+    """
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        return None
+    _local.rerun = None
+
+    if '_desempenho_sessao' not in st.session_state:
+        st.session_state._desempenho_sessao = uuid.uuid4().hex[:12]
+        st.session_state._desempenho = deque(maxlen=HISTORICO_RERUNS)
+
+    registro = {'sessao': st.session_state._desempenho_sessao, 'data': rerun['data'], 'pagina': rerun['pagina'],
+                'total_ms': round((time.perf_counter() - rerun['inicio']) * 1000, 3), 'trechos': rerun['trechos']}
+    referencia = st.session_state.get('dataset')
+    # Datasets consultados direto no Parquet não têm DataFrame em memória para medir
+    if referencia is not None and referencia.em_memoria:
+        registro['df'] = memoria_df(referencia.df, referencia.chave)
+
+    st.session_state._desempenho.append(registro)
+    if ARQUIVO_LOG:
+        with _lock, open(ARQUIVO_LOG, 'a', encoding='utf-8') as arquivo:
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    return registro
+
+
+def trechos_segundo_plano():
+    with _lock:
+        return list(_fora_rerun)
+
+
+def exportar_json():
+    """Reruns recentes da sessão e trechos em segundo plano, prontos para download."""
+    return json.dumps({'reruns': list(st.session_state.get('_desempenho', [])),
+                       'segundo_plano': trechos_segundo_plano()}, ensure_ascii=False, indent=2)
+
+
+def painel(registro):
+    """Painel de depuração na sidebar com o último rerun."""
+    if registro is None:
+        return
+    with st.sidebar.expander("🩺 Desempenho", expanded=False):
+        st.caption(f"Rerun de {registro['pagina']}: {registro['total_ms']:.0f} ms")
+        if registro['trechos']:
+            # Os trechos são registrados ao terminar; ordenar pelo início põe cada um antes dos internos
+            trechos = pd.DataFrame(registro['trechos']).sort_values('inicio_ms', kind='stable')
+            trechos['trecho'] = ['· ' * n + t for n, t in zip(trechos['nivel'], trechos['trecho'])]
+            st.dataframe(trechos[['trecho', 'duracao_ms']], hide_index=True, use_container_width=True)
+
+        if 'df' in registro:
+            mem = registro['df']
+            st.caption(f"Dataset da sessão: {mem['linhas']} linhas, {mem['total_mb']:.1f} MB")
+            colunas = pd.Series(mem['colunas_mb'], name='MB').sort_values(ascending=False)
+            st.dataframe(colunas.rename_axis('Coluna').reset_index(), hide_index=True, use_container_width=True)
+
+        compartilhados = resumo_compartilhado()
+        if not compartilhados.empty:
+            st.caption("Datasets compartilhados (processo)")
+            st.dataframe(compartilhados, hide_index=True, use_container_width=True)
+
+        fundo = trechos_segundo_plano()
+        if fundo:
+            st.caption("Segundo plano (processo)")
+            st.dataframe(pd.DataFrame(fundo).tail(10)[['data', 'trecho', 'duracao_ms']],
+                         hide_index=True, use_container_width=True)
+
+        st.download_button("Exportar JSON", exportar_json(), file_name="desempenho.json", mime="application/json")
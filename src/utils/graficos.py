@@ -0,0 +1,157 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.utils.paginas import importar
+
+LIMITE_FIGURAS = 64
+# Medir o payload serializa a figura uma vez a mais; só com DSH_RELATORIO_PAYLOAD=1
+RELATORIO_PAYLOAD = os.environ.get("DSH_RELATORIO_PAYLOAD") == "1"
+
+DIAS_PT = ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo']
+
+_figuras = OrderedDict()
+_payloads = OrderedDict()
+_lock = threading.Lock()
+
+
+def figura(nome, estado, construir, linhas_origem=None):
+    """
+    Devolve a figura `nome` para o estado de filtros `estado`, construindo-a só na primeira vez.
+    Com o relatório de payload ativo, ao construir registra o tamanho do JSON enviado ao
+    navegador e quantas linhas brutas ela representa, para acompanhar a redução de payload.
+    """
+    chave = (nome, estado)
+    with _lock:
+        fig = _figuras.get(chave)
+        if fig is not None:
+            _figuras.move_to_end(chave)
+            return fig
+
+    fig = construir()
+    payload = None
+    if RELATORIO_PAYLOAD:
+        payload = {'Gráfico': nome, 'Bytes': len(fig.to_json()), 'Pontos enviados': sum(_pontos(t) for t in fig.data),
+                   'Linhas de origem': linhas_origem}
+    with _lock:
+        _figuras[chave] = fig
+        while len(_figuras) > LIMITE_FIGURAS:
+            _figuras.popitem(last=False)
+        if payload is not None:
+            _payloads[nome] = payload
+    return fig
+
+
+def _pontos(trace):
+    for eixo in ('x', 'labels'):
+        valores = getattr(trace, eixo, None)
+        if valores is not None:
+            return len(valores)
+    return 0
+
+
+def relatorio_payload():
+    """Último tamanho de payload registrado para cada gráfico."""
+    with _lock:
+        return pd.DataFrame(list(_payloads.values()))
+
+
+# --- CONSTRUTORES (recebem dados já agregados) ---
+
+def evolucao(df_diario, df_ant_diario, df_pred):
+    go = importar('plotly.graph_objects')
+    fig = go.Figure()
+
+    if df_pred is not None and not df_pred.empty:
+        fig.add_trace(go.Scatter(x=pd.concat([df_pred['ds'], df_pred['ds'][::-1]]),
+                                 y=pd.concat([df_pred['yhat_upper'], df_pred['yhat_lower'][::-1]]),
+                                 fill='toself', fillcolor='rgba(148, 103, 189, 0.2)',
+                                 line_color='rgba(255,255,255,0)', name='Incerteza AI', showlegend=False))
+        fig.add_trace(go.Scatter(x=df_pred['ds'], y=df_pred['yhat'],
+                                 name='Tendência (IA)', line=dict(color='#9467bd', width=3, dash='dot')))
+
+    if not df_ant_diario.empty:
+        fig.add_trace(go.Scatter(x=df_ant_diario['Data_Comp'], y=df_ant_diario['Taxa %'],
+                                 name='Ano Anterior', line=dict(color='gray', dash='dash'), opacity=0.4))
+
+    fig.add_trace(go.Scatter(x=df_diario['Data'], y=df_diario['Taxa %'],
+                             name='Ocupação Atual', mode='lines+markers', line=dict(color='#1f77b4', width=3)))
+
+    fig.add_hline(y=98, line_dash="solid", line_color="red", annotation_text="98%")
+    fig.add_hline(y=85, line_dash="dash", line_color="orange", annotation_text="85%")
+
+    fig.update_layout(hovermode="x unified", margin=dict(l=10, r=10, t=30, b=10),
+                      legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+    fig.update_xaxes(tickformat="%d/%m", tickangle=0)
+    return fig
+
+
+def treemap_setores(somas_setor):
+    """Treemap a partir da soma de Paciente/Dia por setor (uma linha por setor)."""
+    go = importar('plotly.graph_objects')
+    px = importar('plotly.express')
+    fig = go.Figure(go.Treemap(labels=somas_setor['Setor'].astype(str), parents=[''] * len(somas_setor),
+                               values=somas_setor['Paciente/Dia'], branchvalues='total',
+                               marker=dict(colors=(px.colors.qualitative.Safe * (len(somas_setor) // 10 + 1))[:len(somas_setor)])))
+    fig.update_layout(margin=dict(l=10, r=10, t=10, b=10))
+    return fig
+
+
+def movimentacao(df_mov):
+    go = importar('plotly.graph_objects')
+    make_subplots = importar('plotly.subplots').make_subplots
+    fig_mov = make_subplots(specs=[[{"secondary_y": True}]])
+
+    # Barras de Entradas (Internações)
+    fig_mov.add_trace(go.Bar(x=df_mov['Data'], y=df_mov['Intern.'],
+                             name='Entradas (Internações)', marker_color='#2ca02c'), secondary_y=False)
+    # Barras de Saídas
+    fig_mov.add_trace(go.Bar(x=df_mov['Data'], y=df_mov['Saídas'],
+                             name='Saídas (Altas/Óbitos)', marker_color='#d62728'), secondary_y=False)
+    # Linha de Taxa
+    fig_mov.add_trace(go.Scatter(x=df_mov['Data'], y=df_mov['Taxa %'], name='Taxa Ocupação (%)',
+                                 line=dict(color='#FFD700', width=4), mode='lines+markers'), secondary_y=True)
+
+    fig_mov.update_layout(barmode='group', margin=dict(l=10, r=10, t=10, b=10), legend=dict(orientation="h"))
+    fig_mov.update_yaxes(title_text="Volume de Pacientes", secondary_y=False)
+    fig_mov.update_yaxes(title_text="Taxa %", secondary_y=True, range=[0, 110])
+    return fig_mov
+
+
+def estatisticas_box(datas, valores):
+    """
+    Quartis, cercas de Tukey e outliers por dia da semana, calculados no servidor
+    (mesmo método 'linear' de quartis usado pelo Plotly).
+    """
+    dias = pd.DatetimeIndex(datas).dayofweek.to_numpy()
+    valores = np.asarray(valores, dtype='float64')
+    linhas, outliers = [], []
+    for d in range(7):
+        v = np.sort(valores[dias == d])
+        if len(v) == 0:
+            continue
+        q1, mediana, q3 = np.percentile(v, [25, 50, 75])
+        iqr = q3 - q1
+        dentro = v[(v >= q1 - 1.5 * iqr) & (v <= q3 + 1.5 * iqr)]
+        linhas.append({'Dia Semana': DIAS_PT[d], 'q1': q1, 'mediana': mediana, 'q3': q3,
+                       'inferior': dentro.min(), 'superior': dentro.max()})
+        fora = v[(v < q1 - 1.5 * iqr) | (v > q3 + 1.5 * iqr)]
+        outliers += [(DIAS_PT[d], x) for x in fora]
+    return pd.DataFrame(linhas), pd.DataFrame(outliers, columns=['Dia Semana', 'Valor'])
+
+
+def box_dia_semana(estatisticas, outliers):
+    go = importar('plotly.graph_objects')
+    fig_box = go.Figure(go.Box(x=estatisticas['Dia Semana'], q1=estatisticas['q1'], median=estatisticas['mediana'],
+                               q3=estatisticas['q3'], lowerfence=estatisticas['inferior'],
+                               upperfence=estatisticas['superior'], name='Paciente/Dia',
+                               marker_color='#1f77b4', showlegend=False))
+    if not outliers.empty:
+        fig_box.add_trace(go.Scatter(x=outliers['Dia Semana'], y=outliers['Valor'], mode='markers',
+                                     marker=dict(color='#1f77b4', size=5), name='Outliers', showlegend=False))
+    fig_box.update_xaxes(categoryorder='array', categoryarray=DIAS_PT)
+    fig_box.update_layout(margin=dict(l=10, r=10, t=10, b=10))
+    return fig_box
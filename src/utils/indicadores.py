@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+COMPONENTES = ['Paciente/Dia', 'Leitos-dia', 'Intern.', 'Saídas', 'Altas', 'Óbitos', 'Leitos Ativos', 'Linhas']
+
+
+def _razao(num, den, fator=1):
+    """Divisão que devolve 0 quando o denominador é zero (mesma regra dos scorecards)."""
+    num, den = np.asarray(num, dtype='float64'), np.asarray(den, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den > 0, num / den * fator, 0.0)
+
+
+# Cada indicador é uma fórmula sobre as SOMAS das colunas de movimentação.
+# Como só somas são guardadas, qualquer recorte (setores, meses) é consolidado
+# somando os componentes e reaplicando a fórmula, sem revisitar os dados brutos.
+INDICADORES = {
+    'ocupacao': {
+        'rotulo': 'Taxa de Ocupação', 'unidade': '%', 'formato': '{:.1f}%',
+        'colunas': ['Paciente/Dia', 'Leitos-dia'],
+        'formula': lambda s: _razao(s['Paciente/Dia'], s['Leitos-dia'], 100),
+        'ajuda': "Soma de Paciente-Dia dividida pela soma de Leitos-Dia. Indica o uso da capacidade instalada.",
+        'inverso': False,
+    },
+    'permanencia': {
+        'rotulo': 'Tempo Médio de Permanência', 'unidade': 'd', 'formato': '{:.1f} d',
+        'colunas': ['Paciente/Dia', 'Saídas'],
+        'formula': lambda s: _razao(s['Paciente/Dia'], s['Saídas']),
+        'ajuda': "Média de dias que um paciente ocupa um leito. Calculado como Total Paciente-Dia / Total de Saídas.",
+        'inverso': True,
+    },
+    'giro': {
+        'rotulo': 'Giro de Leito', 'unidade': '', 'formato': '{:.2f}',
+        'colunas': ['Saídas', 'Leitos Ativos', 'Linhas'],
+        'formula': lambda s: _razao(s['Saídas'], _razao(s['Leitos Ativos'], s['Linhas'])),
+        'ajuda': "Produtividade do leito: quantos pacientes utilizaram cada leito operacional no período.",
+        'inverso': False,
+    },
+    'mortalidade': {
+        'rotulo': 'Taxa de Mortalidade', 'unidade': '%', 'formato': '{:.2f}%',
+        'colunas': ['Óbitos', 'Saídas'],
+        'formula': lambda s: _razao(s['Óbitos'], s['Saídas'], 100),
+        'ajuda': "Óbitos divididos pelo total de Saídas (altas + óbitos) do período.",
+        'inverso': True,
+    },
+    'substituicao': {
+        'rotulo': 'Intervalo de Substituição', 'unidade': 'd', 'formato': '{:.2f} d',
+        'colunas': ['Leitos-dia', 'Paciente/Dia', 'Saídas'],
+        'formula': lambda s: _razao(np.asarray(s['Leitos-dia'], dtype='float64') - s['Paciente/Dia'], s['Saídas']),
+        'ajuda': "Tempo médio, em dias, que um leito fica vago entre a saída de um paciente e a entrada do seguinte.",
+        'inverso': True,
+    },
+}
+
+
+def disponiveis(colunas):
+    """Indicadores cujas colunas de origem existem no dataset."""
+    return [nome for nome, ind in INDICADORES.items() if all(c in colunas for c in ind['colunas'])]
+
+
+def aplicar(somas):
+    """Acrescenta as colunas de indicadores a um dataframe (ou Series) de somas."""
+    resultado = somas.astype('float64') if isinstance(somas, pd.Series) else somas.copy()
+    for nome in disponiveis(somas.index if isinstance(somas, pd.Series) else somas.columns):
+        valor = INDICADORES[nome]['formula'](somas)
+        resultado[nome] = float(valor) if np.ndim(valor) == 0 else valor
+    return resultado
+
+
+def base_indicadores(cubo):
+    """
+    Somas mensais por (Origem, Ano, Mes, Setor) e todos os indicadores, em uma única passagem
+    agrupada sobre o cubo diário (ou no motor de consulta, quando o cubo lê do Parquet).
+    """
+    return aplicar(cubo.somas_mensais())
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def obter_indicadores(chave, _cubo):
+    """Base de indicadores do dataset identificado por `chave` (calculada uma vez)."""
+    return base_indicadores(_cubo)
+
+
+def recortar(base, origem=None, ano=None, mes=None, setores=None):
+    mask = np.ones(len(base), dtype=bool)
+    if origem is not None:
+        mask &= (base['Origem'] == origem).to_numpy()
+    if ano is not None:
+        mask &= (base['Ano'] == ano).to_numpy()
+    if mes is not None:
+        mask &= (base['Mes'] == mes).to_numpy()
+    if setores is not None:
+        mask &= base['Setor'].isin(setores).to_numpy()
+    return base[mask]
+
+
+def consolidar(base, origem=None, ano=None, mes=None, setores=None, por=None):
+    """
+    Indicadores do recorte pedido. Sem `por`, devolve uma Series com o total do recorte;
+    com `por` (ex.: ['Ano', 'Mes'] ou 'Setor'), um dataframe com uma linha por grupo.
+    """
+    fatia = recortar(base, origem, ano, mes, setores)
+    componentes = [c for c in COMPONENTES if c in base.columns]
+    if por is None:
+        return aplicar(fatia[componentes].sum())
+    return aplicar(fatia.groupby(por, observed=True)[componentes].sum()).reset_index()
@@ -0,0 +1,184 @@
+import hashlib
+import io
+import os
+from pathlib import Path
+
+import pandas as pd
+
+# Diretório local onde os datasets normalizados ficam guardados em Parquet
+CACHE_DIR = Path(os.environ.get("DSH_CACHE_DIR", ".cache")) / "datasets"
+
+# Histórico incremental: um Parquet por mês (AAAA-MM.parquet)
+HISTORICO_DIR = Path(os.environ.get("DSH_CACHE_DIR", ".cache")) / "historico"
+
+# Incrementar sempre que o schema abaixo mudar, para invalidar o cache antigo
+VERSAO_SCHEMA = 1
+
+FORMATO_DATA = "%d/%m/%Y"
+COLUNAS_CATEGORICAS = ['Setor', 'Origem']
+COLUNAS_OBRIGATORIAS = ['Data', 'Setor', 'Origem']
+CHAVE_DEDUP = ['Data', 'Setor', 'Origem']
+TAMANHO_CHUNK = 50_000
+COLUNAS_NUMERICAS = ['Paciente/Dia', 'Leitos-dia', 'Intern.', 'Saídas', 'Altas', 'Óbitos', 'Leitos Ativos']
+# Tipo fixo das colunas numéricas no histórico em disco: inteiros exatos até 16 milhões e aceita faltantes
+TIPO_NUMERICO_HISTORICO = 'float32'
+
+
+def hash_conteudo(conteudo):
+    """Gera a chave do dataset a partir dos bytes do arquivo enviado."""
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def converter_datas(serie):
+    """Converte a coluna Data usando o formato fixo da exportação (dd/mm/aaaa)."""
+    try:
+        return pd.to_datetime(serie, format=FORMATO_DATA)
+    except (ValueError, TypeError):
+        # Exportações antigas podem trazer hora ou outro separador
+        return pd.to_datetime(serie, dayfirst=True)
+
+
+def normalizar(df):
+    """
+    Aplica o schema explícito ao dataframe: datas, categorias e numéricos reduzidos.
+    """
+    df['Data'] = converter_datas(df['Data'])
+    return tipar_colunas(df)
+
+
+def tipar_colunas(df):
+    """Converte Setor/Origem para categoria e reduz as colunas numéricas ao menor tipo possível."""
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    for col in COLUNAS_NUMERICAS:
+        if col in df.columns:
+            serie = pd.to_numeric(df[col], errors='coerce')
+            if serie.isna().any() or not (serie % 1 == 0).all():
+                df[col] = pd.to_numeric(serie, downcast='float')
+            else:
+                df[col] = pd.to_numeric(serie, downcast='integer')
+
+    return df
+
+
+def tipar_historico(df):
+    """
+    Schema fixo das partições do histórico. Cada mês é gravado num Parquet próprio e todos são
+    lidos juntos, então o tipo não pode depender dos valores do mês (como em tipar_colunas).
+    """
+    df['Data'] = df['Data'].astype('datetime64[ns]')
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype(str)
+    for col in COLUNAS_NUMERICAS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(TIPO_NUMERICO_HISTORICO)
+    return df
+
+
+def ler_csv(arquivo):
+    """Lê o CSV de movimentação setorial já com os tipos definidos."""
+    dtypes = {col: 'category' for col in COLUNAS_CATEGORICAS}
+    df = pd.read_csv(arquivo, sep=',', dtype=dtypes)
+    return normalizar(df)
+
+
+def caminho_cache(chave):
+    return CACHE_DIR / f"{chave}.v{VERSAO_SCHEMA}.parquet"
+
+
+def carregar_dataset(conteudo):
+    """
+    Retorna (chave, dataframe) para os bytes enviados.
+    O CSV só é processado na primeira vez; depois o Parquet local é reutilizado.
+    """
+    chave = hash_conteudo(conteudo)
+    caminho = caminho_cache(chave)
+
+    if caminho.exists():
+        try:
+            return chave, pd.read_parquet(caminho)
+        except Exception:
+            # Arquivo corrompido (ex.: processo interrompido): reprocessa
+            caminho.unlink(missing_ok=True)
+
+    df = ler_csv(io.BytesIO(conteudo))
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_suffix('.tmp')
+    df.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+
+    return chave, df
+
+
+# --- CARGA INCREMENTAL (HISTÓRICO PARTICIONADO POR MÊS) ---
+
+def validar_chunk(df):
+    """Garante que o bloco lido tem as colunas mínimas e descarta linhas sem chave."""
+    faltantes = [col for col in COLUNAS_OBRIGATORIAS if col not in df.columns]
+    if faltantes:
+        raise ValueError(f"Colunas obrigatórias ausentes no arquivo: {', '.join(faltantes)}")
+    return df.dropna(subset=CHAVE_DEDUP)
+
+
+def _mesclar_particao(diretorio, periodo, novos):
+    """Funde as linhas novas com a partição do mês; em duplicidade prevalece o dado mais recente."""
+    caminho = diretorio / f"{periodo}.parquet"
+    if caminho.exists():
+        existentes = pd.read_parquet(caminho)
+        novos = pd.concat([existentes, novos], ignore_index=True)
+
+    novos = novos.drop_duplicates(subset=CHAVE_DEDUP, keep='last')
+    novos = tipar_historico(novos.sort_values(CHAVE_DEDUP, ignore_index=True))
+
+    temporario = caminho.with_suffix('.tmp')
+    novos.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+
+
+def anexar_csv(arquivo, diretorio=HISTORICO_DIR, chunksize=TAMANHO_CHUNK):
+    """
+    Lê o CSV em blocos e anexa cada mês ao histórico em disco, deduplicando por
+    (Data, Setor, Origem). A memória usada fica limitada a um bloco + uma partição mensal.
+    Retorna o resumo da carga: linhas lidas e meses afetados.
+    """
+    diretorio = Path(diretorio)
+    diretorio.mkdir(parents=True, exist_ok=True)
+
+    linhas, meses = 0, set()
+    dtypes = {col: 'category' for col in COLUNAS_CATEGORICAS}
+    for chunk in pd.read_csv(arquivo, sep=',', dtype=dtypes, chunksize=chunksize):
+        # Valida as colunas do bloco bruto: normalizar() depende de Data
+        chunk = normalizar(validar_chunk(chunk))
+        linhas += len(chunk)
+        for periodo, parte in chunk.groupby(chunk['Data'].dt.to_period('M')):
+            _mesclar_particao(diretorio, periodo, parte)
+            meses.add(str(periodo))
+
+    return {'linhas': linhas, 'meses': sorted(meses)}
+
+
+def particoes_historico(diretorio=HISTORICO_DIR):
+    return sorted(Path(diretorio).glob("*.parquet"))
+
+
+def hash_historico(diretorio=HISTORICO_DIR):
+    """Chave do histórico atual, derivada do nome, tamanho e data de alteração das partições."""
+    h = hashlib.sha256()
+    for caminho in particoes_historico(diretorio):
+        info = caminho.stat()
+        h.update(f"{caminho.name}:{info.st_size}:{info.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+def carregar_historico(diretorio=HISTORICO_DIR):
+    """Lê todas as partições mensais em um único dataframe tipado (ou None se vazio)."""
+    particoes = particoes_historico(diretorio)
+    if not particoes:
+        return None
+
+    df = pd.concat([pd.read_parquet(p) for p in particoes], ignore_index=True)
+    return tipar_colunas(df)
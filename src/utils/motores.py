@@ -0,0 +1,232 @@
+import argparse
+import importlib.util
+import os
+import time
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# Motor usado quando nenhum é informado; pode ser trocado por implantação
+MOTOR_PADRAO = os.environ.get("DSH_MOTOR_PREVISAO", "prophet")
+
+
+class MotorRapido:
+    """
+    Holt-Winters aditivo com tendência amortecida e sazonalidade semanal, em NumPy.
+
+    Os parâmetros de suavização são escolhidos por busca em grade: a recursão percorre
+    a série uma única vez avaliando todas as combinações como vetores, e a de menor
+    erro quadrático de um passo à frente é usada na previsão.
+    """
+    nome = 'rapido'
+    persistente = False  # o ajuste custa milissegundos, não vale serializar
+    sincrono = True
+    aquecimento = False
+    config_padrao = {'sazonalidade': 7, 'amortecimento': 0.98, 'interval_width': 0.8}
+
+    ALPHAS = np.array([0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.65, 0.8])
+    BETAS = np.array([0.0, 0.01, 0.05, 0.1])
+    GAMMAS = np.array([0.01, 0.05, 0.1, 0.2, 0.3])
+
+    def ajustar(self, serie, config):
+        m = int(config['sazonalidade'])
+        phi = float(config['amortecimento'])
+
+        # Dias sem registro são interpolados para manter a sazonalidade alinhada
+        diaria = serie.set_index('ds')['y'].replace([np.inf, -np.inf], np.nan)
+        diaria = diaria.asfreq('D').interpolate(limit_direction='both')
+        y = diaria.to_numpy(dtype='float64')
+        if len(y) < 2 * m:
+            raise ValueError(f"Série curta demais para o motor rápido ({len(y)} dias).")
+
+        alpha, beta, gamma = (g.ravel() for g in np.meshgrid(self.ALPHAS, self.BETAS, self.GAMMAS))
+        nivel, tendencia, sazonal, ajustado = self._filtrar(y, m, phi, alpha, beta, gamma)
+
+        sse = ((y[m:] - ajustado[:, m:]) ** 2).sum(axis=1)
+        k = int(np.argmin(sse))
+        residuos = y[m:] - ajustado[k, m:]
+
+        return {
+            'ds': diaria.index, 'y': y, 'ajustado': ajustado[k],
+            'nivel': nivel[k], 'tendencia': tendencia[k], 'sazonal': sazonal[k],
+            'phi': phi, 'm': m, 'sigma': float(residuos.std(ddof=1)),
+            'z': _quantil_normal(config.get('interval_width', 0.8)),
+            'params': (float(alpha[k]), float(beta[k]), float(gamma[k])),
+        }
+
+    @staticmethod
+    def _filtrar(y, m, phi, alpha, beta, gamma):
+        """Recursão de Holt-Winters para K combinações de parâmetros de uma só vez."""
+        k = len(alpha)
+        nivel = np.full(k, y[:m].mean())
+        tendencia = np.full(k, (y[m:2 * m].mean() - y[:m].mean()) / m)
+        sazonal = np.tile(y[:m] - y[:m].mean(), (k, 1))
+        ajustado = np.empty((k, len(y)))
+
+        for t, obs in enumerate(y):
+            i = t % m
+            s = sazonal[:, i]
+            ajustado[:, t] = nivel + phi * tendencia + s
+            novo_nivel = alpha * (obs - s) + (1 - alpha) * (nivel + phi * tendencia)
+            tendencia = beta * (novo_nivel - nivel) + (1 - beta) * phi * tendencia
+            sazonal[:, i] = gamma * (obs - novo_nivel) + (1 - gamma) * s
+            nivel = novo_nivel
+
+        return nivel, tendencia, sazonal, ajustado
+
+    def prever(self, modelo, periodos):
+        m, phi, n = modelo['m'], modelo['phi'], len(modelo['y'])
+        h = np.arange(1, periodos + 1)
+        amortecido = np.cumsum(phi ** h)
+        futuro = modelo['nivel'] + amortecido * modelo['tendencia'] + modelo['sazonal'][(n + h - 1) % m]
+
+        yhat = np.r_[modelo['ajustado'], futuro]
+        margem = modelo['z'] * modelo['sigma'] * np.r_[np.ones(n), np.sqrt(h)]
+        ds = pd.date_range(modelo['ds'][0], periods=n + periodos, freq='D')
+        return pd.DataFrame({'ds': ds, 'yhat': yhat,
+                             'yhat_lower': yhat - margem, 'yhat_upper': yhat + margem})
+
+
+class MotorProphet:
+    """Prophet (opcional): captura sazonalidade anual, mas o ajuste em Stan leva segundos."""
+    nome = 'prophet'
+    persistente = True
+    sincrono = False
+    aquecimento = True  # aceita os parâmetros de um ajuste anterior como ponto de partida
+    config_padrao = {'yearly_seasonality': True, 'daily_seasonality': False, 'interval_width': 0.8}
+
+    def ajustar(self, serie, config, inicial=None):
+        from prophet import Prophet
+        modelo = Prophet(**config)
+        if inicial is None:
+            modelo.fit(serie)
+        else:
+            # A otimização parte do ótimo anterior e converge em poucas iterações
+            modelo.fit(serie, init=self.parametros_iniciais(inicial))
+        return modelo
+
+    @staticmethod
+    def parametros_iniciais(modelo):
+        """Parâmetros ajustados de `modelo` no formato do `init` do Stan."""
+        init = {nome: modelo.params[nome][0][0] for nome in ('k', 'm', 'sigma_obs')}
+        init.update({nome: modelo.params[nome][0] for nome in ('delta', 'beta')})
+        return init
+
+    @staticmethod
+    def inicial_compativel(modelo, serie, config):
+        """
+        True se os parâmetros de `modelo` servem de ponto de partida para ajustar `serie`.
+        Em séries curtas o Prophet reduz os changepoints (80% do histórico menos um), e um
+        `delta` de outro tamanho não pode ser usado no `init`.
+        """
+        from prophet import Prophet
+        novo = Prophet(**config)
+        historico = int(np.floor(serie['y'].notna().sum() * novo.changepoint_range))
+        # Sem nenhum changepoint o Prophet ainda estima um delta (changepoint fictício)
+        changepoints = max(1, min(novo.n_changepoints, historico - 1))
+        return len(modelo.params['delta'][0]) == changepoints
+
+    def prever(self, modelo, periodos):
+        futuro = modelo.make_future_dataframe(periods=periodos)
+        return modelo.predict(futuro)
+
+    def serializar(self, modelo):
+        from prophet.serialize import model_to_json
+        return model_to_json(modelo)
+
+    def desserializar(self, texto):
+        from prophet.serialize import model_from_json
+        return model_from_json(texto)
+
+
+MOTORES = {'rapido': MotorRapido, 'prophet': MotorProphet}
+
+
+def prophet_disponivel():
+    # A primeira importação (a mais cara do app) entra no relatório de importação
+    from src.utils.paginas import importar
+    try:
+        importar('prophet')
+    except ImportError:
+        return False
+    return True
+
+
+def nome_motor(nome=None):
+    """Nome do motor que obter_motor usaria, sem importar o Prophet (chaves de cache e resultados salvos)."""
+    nome = nome or MOTOR_PADRAO
+    if nome not in MOTORES:
+        raise ValueError(f"Motor de previsão desconhecido: {nome}. Opções: {', '.join(MOTORES)}")
+    if nome == 'prophet' and importlib.util.find_spec('prophet') is None:
+        return 'rapido'
+    return nome
+
+
+def obter_motor(nome=None):
+    """Instancia o motor pedido; sem Prophet instalado, recorre ao motor rápido."""
+    nome = nome or MOTOR_PADRAO
+    if nome not in MOTORES:
+        raise ValueError(f"Motor de previsão desconhecido: {nome}. Opções: {', '.join(MOTORES)}")
+    if nome == 'prophet' and not prophet_disponivel():
+        nome = 'rapido'
+    return MOTORES[nome]()
+
+
+def _quantil_normal(p):
+    """Quantil normal que delimita um intervalo central de probabilidade p."""
+    return NormalDist().inv_cdf(0.5 + p / 2)
+
+
+# --- BACKTEST ---
+
+def backtest(serie, motores=('rapido', 'prophet'), horizonte=7, origens=8, passo=7):
+    """
+    Backtest de origem móvel: para cada corte, ajusta no passado e prevê `horizonte` dias.
+    Retorna MAE (pontos percentuais de ocupação) e tempo médio de ajuste por motor.
+    """
+    serie = serie.sort_values('ds').reset_index(drop=True)
+    n = len(serie)
+    cortes = [n - horizonte - i * passo for i in range(origens)]
+    cortes = [c for c in cortes if c > 2 * horizonte]
+
+    resultados = []
+    for nome in motores:
+        if nome == 'prophet' and not prophet_disponivel():
+            continue
+        motor = MOTORES[nome]()
+        erros, tempos = [], []
+        for corte in cortes:
+            treino, teste = serie.iloc[:corte], serie.iloc[corte:corte + horizonte]
+            inicio = time.perf_counter()
+            modelo = motor.ajustar(treino, motor.config_padrao)
+            tempos.append(time.perf_counter() - inicio)
+            previsao = motor.prever(modelo, horizonte).set_index('ds')['yhat']
+            real = teste.set_index('ds')['y']
+            erros.append((previsao.reindex(real.index) - real).abs().mean())
+        resultados.append({'Motor': nome, 'MAE': float(np.nanmean(erros)),
+                           'Tempo ajuste (s)': float(np.mean(tempos)), 'Origens': len(cortes)})
+
+    return pd.DataFrame(resultados)
+
+
+def main():
+    from src.utils.ingest import ler_csv
+    from src.utils.previsao import serie_ocupacao
+
+    parser = argparse.ArgumentParser(description="Compara os motores de previsão no histórico informado.")
+    parser.add_argument("arquivo", help="CSV de movimentação setorial")
+    parser.add_argument("--horizonte", type=int, default=7)
+    parser.add_argument("--origens", type=int, default=8)
+    parser.add_argument("--passo", type=int, default=7)
+    parser.add_argument("--motores", default="rapido,prophet")
+    args = parser.parse_args()
+
+    df = ler_csv(args.arquivo)
+    serie = serie_ocupacao(df[df['Origem'] == 'Internação'])
+    resultado = backtest(serie, args.motores.split(','), args.horizonte, args.origens, args.passo)
+    print(resultado.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import importlib
+import importlib.util
+import sys
+import time
+
+PAGINA_INICIAL = "Página Inicial"
+
+# Rótulo da sidebar -> módulo da página (importado somente quando selecionado)
+PAGINAS = {
+    PAGINA_INICIAL: "src.pages.home",
+    "Taxa de Ocupação Hospitalar": "src.pages.ocupacao_geral",
+    "Taxa de Ocupação da UTI": "src.pages.ocupacao_uti",
+    "Taxa de Mortalidade": "src.pages.mortalidade",
+    "Tempo de Permanência em leitos Cirurgicos": "src.pages.permanencia_cirurgica",
+    "Tempo de Permanência em leitos de Clínica Médica": "src.pages.permanencia_clinica",
+    "Tempo de Permanência no Pronto Socorro": "src.pages.permanencia_ps",
+}
+
+# Dependências comuns às páginas, medidas antes delas no relatório: sem isso a primeira
+# página importada absorve o custo de streamlit/pandas e parece mais cara do que é
+BIBLIOTECAS = ['numpy', 'pyarrow', 'pandas', 'streamlit']
+# Opcionais importadas sob demanda (o Prophet é medido quando o primeiro ajuste o carrega)
+OPCIONAIS = ['prophet']
+
+# Custo da primeira importação de cada módulo neste processo (segundos)
+_tempos = {}
+
+
+def importar(nome):
+    """import_module com registro do tempo gasto na primeira importação do módulo."""
+    if nome in sys.modules:
+        return sys.modules[nome]
+    inicio = time.perf_counter()
+    modulo = importlib.import_module(nome)
+    _tempos[nome] = time.perf_counter() - inicio
+    return modulo
+
+
+def carregar_pagina(rotulo):
+    return importar(PAGINAS[rotulo])
+
+
+def importar_bibliotecas():
+    """Importa (e mede) as bibliotecas comuns antes de qualquer página."""
+    for nome in BIBLIOTECAS:
+        importar(nome)
+
+
+def tipo_modulo(nome):
+    """Página do dashboard ou biblioteca (inclusive submódulos como plotly.graph_objects)."""
+    return 'Página' if nome in PAGINAS.values() else 'Biblioteca'
+
+
+def relatorio_importacao():
+    """
+    Tempo de importação por módulo, do mais caro para o mais barato. Bibliotecas já carregadas
+    antes da primeira medição não aparecem; o tempo de cada página exclui as de BIBLIOTECAS.
+    """
+    import pandas as pd
+
+    df = pd.DataFrame([(nome, tipo_modulo(nome), tempo)
+                       for nome, tempo in _tempos.items()], columns=['Módulo', 'Tipo', 'Tempo (s)'])
+    return df.sort_values('Tempo (s)', ascending=False, ignore_index=True)
+
+
+if __name__ == "__main__":
+    # Mede o custo de partida a frio: bibliotecas comuns primeiro, depois cada página
+    importar_bibliotecas()
+    for rotulo in PAGINAS:
+        carregar_pagina(rotulo)
+    for nome in OPCIONAIS:
+        if importlib.util.find_spec(nome) is not None:
+            importar(nome)
+    print(relatorio_importacao().to_string(index=False))
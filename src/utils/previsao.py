@@ -0,0 +1,382 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from src.utils.desempenho import trecho
+
+# Modelos de ML (motor rápido embutido ou Prophet opcional)
+from src.utils.motores import MOTORES, nome_motor, obter_motor
+
+# Modelos ajustados ficam serializados em disco e são removidos por LRU quando passam do limite
+MODELOS_DIR = Path(os.environ.get("DSH_CACHE_DIR", ".cache")) / "modelos"
+LIMITE_DISCO_MB = float(os.environ.get("DSH_MODELOS_LIMITE_MB", 200))
+LIMITE_MEMORIA = int(os.environ.get("DSH_MODELOS_MEMORIA", 64))
+
+# O ajuste do Prophet roda no CmdStan (subprocesso), então threads já ocupam núcleos distintos
+MAX_WORKERS = int(os.environ.get("DSH_PREVISAO_WORKERS", os.cpu_count() or 2))
+
+# Segundos em que uma previsão (ou backtest) que falhou deixa de ser reagendada (evita refazer um ajuste inviável a cada rerun)
+ESPERA_FALHA = float(os.environ.get("DSH_PREVISAO_ESPERA_FALHA", 60))
+
+# Quantos dias a menos a série pode ter em relação a um ajuste anterior para reaproveitá-lo como ponto de partida
+JANELA_AQUECIMENTO = int(os.environ.get("DSH_AQUECIMENTO_DIAS", 14))
+
+# Backtest da Projeção Final: meses fechados avaliados e dias do mês em que a projeção é refeita
+MESES_BACKTEST = int(os.environ.get("DSH_BACKTEST_MESES", 6))
+ORIGENS_BACKTEST = (7, 14, 21)
+MINIMO_TREINO = 30
+
+_memoria = OrderedDict()
+_pendentes = {}
+_falhas = {}
+_lock = threading.Lock()
+_lock_disco = threading.Lock()
+# Uma trava por fingerprint: horizontes diferentes do mesmo modelo esperam um único ajuste
+_travas = weakref.WeakValueDictionary()
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="previsao")
+# O backtest é coordenado numa thread própria e ajusta as origens em paralelo num pool separado,
+# sem ocupar os workers das previsões da página (e sem esperar por eles)
+_backtests = OrderedDict()
+_falhas_backtest = {}
+_executor_backtest = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backtest")
+_executor_backtest_ajustes = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="backtest-ajuste")
+
+
+def serie_ocupacao(df):
+    """Série diária da Taxa de Ocupação (ds, y) no formato esperado pelos motores de previsão."""
+    serie = df.groupby('Data').agg({'Paciente/Dia': 'sum', 'Leitos-dia': 'sum'}).reset_index()
+    serie['y'] = (serie['Paciente/Dia'] / serie['Leitos-dia'] * 100)
+    serie = serie.rename(columns={'Data': 'ds'})[['ds', 'y']]
+    serie['ds'] = serie['ds'].dt.tz_localize(None)
+    return serie
+
+
+def horizonte_mes(serie, ano, mes):
+    """Último dia com dado real, dias até o fim do mês e períodos a prever (no mínimo 7, para a tendência)."""
+    ultimo_real = serie['ds'].max()
+    fim_mes = pd.Timestamp(ano, mes, 1) + pd.offsets.MonthEnd(0)
+    dias_para_prever = (fim_mes - ultimo_real).days
+    return ultimo_real, dias_para_prever, max(7, dias_para_prever)
+
+
+def media_prevista_mes(forecast, ano, mes):
+    """Média esperada da Taxa de Ocupação no mês (real + previsto)."""
+    no_mes = (forecast['ds'].dt.year == ano) & (forecast['ds'].dt.month == mes)
+    return forecast[no_mes]['yhat'].mean()
+
+
+def resumir_projecao(forecast, ultimo_real, ano, mes, dias_para_prever):
+    """
+    Tendência dos próximos 7 dias e projeção de fechamento do mês (None quando o mês
+    já terminou nos dados e não há o que projetar).
+    """
+    df_pred = forecast[forecast['ds'] > ultimo_real].head(7)
+    proj = media_prevista_mes(forecast, ano, mes) if dias_para_prever > 0 else None
+    return df_pred, proj
+
+
+def fingerprint(serie, config, motor):
+    """Identifica o modelo pela série de treino, pelo motor e pelos seus parâmetros."""
+    h = hashlib.sha256()
+    h.update(motor.encode())
+    h.update(serie['ds'].to_numpy(dtype='datetime64[ns]').view('int64').tobytes())
+    h.update(serie['y'].to_numpy(dtype='float64').tobytes())
+    h.update(json.dumps(config, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def _caminho(chave):
+    return MODELOS_DIR / f"{chave}.json"
+
+
+def _carregar_disco(chave, motor):
+    caminho = _caminho(chave)
+    if not caminho.exists():
+        return None
+    try:
+        modelo = motor.desserializar(caminho.read_text())
+    except FileNotFoundError:
+        # Removido pelo LRU de outro worker depois do exists()
+        return None
+    except Exception:
+        caminho.unlink(missing_ok=True)
+        return None
+    # Marca o uso para a política LRU
+    try:
+        os.utime(caminho)
+    except FileNotFoundError:
+        pass
+    return modelo
+
+
+def _salvar_disco(chave, modelo, motor):
+    MODELOS_DIR.mkdir(parents=True, exist_ok=True)
+    caminho = _caminho(chave)
+    temporario = caminho.with_suffix('.tmp')
+    temporario.write_text(motor.serializar(modelo))
+    os.replace(temporario, caminho)
+    _aplicar_limite_disco()
+
+
+def _aplicar_limite_disco():
+    """
+    Remove os modelos usados há mais tempo até o diretório caber no limite.
+    Roda sob _lock_disco: com vários workers salvando ao mesmo tempo, só um faz a limpeza por vez.
+    """
+    with _lock_disco:
+        arquivos = []
+        for caminho in MODELOS_DIR.glob("*.json"):
+            try:
+                info = caminho.stat()
+            except FileNotFoundError:
+                # Removido entre a listagem e o stat (ex.: modelo corrompido descartado por outra thread)
+                continue
+            arquivos.append((info.st_mtime, info.st_size, caminho))
+        arquivos.sort(key=lambda a: a[0])
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        limite = LIMITE_DISCO_MB * 1024 * 1024
+        while arquivos and total > limite:
+            _, tamanho, antigo = arquivos.pop(0)
+            total -= tamanho
+            antigo.unlink(missing_ok=True)
+
+
+def _modelo_anterior(serie, config, motor):
+    """
+    Modelo já ajustado para esta mesma série com alguns dias a menos (ou seja, a série só foi
+    estendida), procurado em memória e em disco. Serve de ponto de partida para o novo ajuste
+    quando os seus parâmetros têm as dimensões que o novo modelo terá.
+    """
+    for dias in range(1, min(JANELA_AQUECIMENTO, len(serie) - MINIMO_TREINO) + 1):
+        chave = fingerprint(serie.iloc[:-dias], config, motor.nome)
+        with _lock:
+            entrada = _memoria.get(chave)
+        modelo = entrada['modelo'] if entrada is not None else None
+        if modelo is None and motor.persistente:
+            modelo = _carregar_disco(chave, motor)
+        if modelo is not None and motor.inicial_compativel(modelo, serie, config):
+            return modelo
+    return None
+
+
+def obter_modelo(serie, config=None, motor=None, persistir=True, cachear=True):
+    """
+    Retorna o modelo ajustado para a série, reaproveitando memória e (Prophet) disco.
+    Só ajusta quando a combinação série + motor + parâmetros nunca foi vista.
+    Com persistir=False o modelo novo não é gravado em disco e com cachear=False não entra no LRU
+    em memória (ajustes descartáveis, como os do backtest, não expulsam os modelos da página).
+    """
+    motor = obter_motor(motor)
+    config = config or motor.config_padrao
+    chave = fingerprint(serie, config, motor.nome)
+
+    with _lock:
+        entrada = _memoria.get(chave)
+        if entrada is not None:
+            _memoria.move_to_end(chave)
+            return chave, entrada
+        trava = _travas.setdefault(chave, threading.Lock())
+
+    with trava:
+        # Outra thread pode ter ajustado o mesmo modelo enquanto esta esperava a trava
+        with _lock:
+            entrada = _memoria.get(chave)
+            if entrada is not None:
+                _memoria.move_to_end(chave)
+                return chave, entrada
+
+        modelo = _carregar_disco(chave, motor) if motor.persistente else None
+        if modelo is None:
+            anterior = _modelo_anterior(serie, config, motor) if motor.aquecimento else None
+            with trecho("previsao.ajuste", motor=motor.nome, pontos=len(serie), aquecido=anterior is not None):
+                if anterior is not None:
+                    modelo = motor.ajustar(serie, config, inicial=anterior)
+                else:
+                    modelo = motor.ajustar(serie, config)
+            if motor.persistente and persistir:
+                _salvar_disco(chave, modelo, motor)
+
+        entrada = {'modelo': modelo, 'motor': motor, 'previsoes': {}}
+        if not cachear:
+            return chave, entrada
+        with _lock:
+            _memoria[chave] = entrada
+            while len(_memoria) > LIMITE_MEMORIA:
+                _memoria.popitem(last=False)
+    return chave, entrada
+
+
+def prever(serie, periodos, config=None, motor=None, persistir=True, cachear=True):
+    """Histórico ajustado + `periodos` dias futuros (colunas ds, yhat, yhat_lower, yhat_upper)."""
+    _, entrada = obter_modelo(serie, config, motor, persistir, cachear)
+    previsoes = entrada['previsoes']
+    if periodos not in previsoes:
+        with trecho("previsao.predicao", motor=entrada['motor'].nome, periodos=periodos):
+            previsoes[periodos] = entrada['motor'].prever(entrada['modelo'], periodos)
+    return previsoes[periodos]
+
+
+# --- EXECUÇÃO EM SEGUNDO PLANO ---
+
+def agendar_previsao(serie, periodos, config=None, motor=None):
+    """
+    Agenda `prever` no pool de workers e devolve um Future, sem bloquear a renderização.
+    Se a previsão já estiver em cache (ou o motor for síncrono) o Future volta concluído;
+    pedidos repetidos enquanto o ajuste está em andamento reaproveitam o mesmo Future.
+    Um Future que falhou é devolvido por ESPERA_FALHA segundos; depois disso o ajuste é refeito.
+    O motor só é instanciado no worker: importar o Prophet na thread do script atrasaria a página.
+    """
+    nome = nome_motor(motor)
+    classe = MOTORES[nome]
+    config = config or classe.config_padrao
+    chave_modelo = fingerprint(serie, config, nome)
+    chave = (chave_modelo, periodos)
+
+    if classe.sincrono:
+        pronto = Future()
+        try:
+            pronto.set_result(prever(serie, periodos, config, nome))
+        except Exception as e:
+            pronto.set_exception(e)
+        return pronto
+
+    with _lock:
+        _expirar_falhas()
+        entrada = _memoria.get(chave_modelo)
+        if entrada is not None and periodos in entrada['previsoes']:
+            pronto = Future()
+            pronto.set_result(entrada['previsoes'][periodos])
+            return pronto
+
+        futuro = _pendentes.get(chave)
+        novo = futuro is None
+        if novo:
+            futuro = _executor.submit(prever, serie, periodos, config, nome)
+            _pendentes[chave] = futuro
+
+    if novo:
+        futuro.add_done_callback(lambda f: _liberar(chave, f))
+    return futuro
+
+
+def _liberar(chave, futuro):
+    with _lock:
+        if futuro.exception() is None:
+            _pendentes.pop(chave, None)
+        else:
+            # A falha continua em _pendentes até expirar, para não reagendar o ajuste a cada rerun
+            _falhas[chave] = time.monotonic()
+
+
+def _expirar_falhas():
+    """Descarta as falhas mais antigas que ESPERA_FALHA; o próximo pedido tenta de novo. Chamar com _lock."""
+    limite = time.monotonic() - ESPERA_FALHA
+    for chave in [c for c, instante in _falhas.items() if instante < limite]:
+        del _falhas[chave]
+        _pendentes.pop(chave, None)
+
+
+def backtest_fechamento(diario, meses=MESES_BACKTEST, origens=ORIGENS_BACKTEST, config=None, motor=None):
+    """
+    Backtest com origem móvel da Projeção Final. Para cada um dos últimos `meses` meses fechados
+    e cada dia de origem, o modelo vê só os dados até aquele dia, a projeção de fechamento é feita
+    como na página e comparada com a ocupação real do mês (soma de Paciente/Dia / soma de Leitos-dia).
+    As origens são ajustadas em paralelo no pool do backtest, sem gravar os modelos em disco nem
+    no cache em memória; uma origem cujo ajuste falha fica de fora do resultado.
+    """
+    serie = serie_ocupacao(diario)
+    if serie.empty:
+        return pd.DataFrame()
+    mes_corrente = serie['ds'].max().to_period('M')
+    periodos_mes = diario['Data'].dt.to_period('M')
+    fechados = sorted(p for p in periodos_mes.unique() if p < mes_corrente)[-meses:]
+
+    # Agenda todas as origens antes de esperar por qualquer uma
+    pendentes = []
+    for periodo in fechados:
+        no_mes = diario[periodos_mes == periodo]
+        real = no_mes['Paciente/Dia'].sum() / no_mes['Leitos-dia'].sum() * 100
+        for dia in origens:
+            treino = serie[serie['ds'] <= pd.Timestamp(periodo.year, periodo.month, dia)]
+            if len(treino) < MINIMO_TREINO:
+                continue
+            ultimo_real, dias_para_prever, periodos = horizonte_mes(treino, periodo.year, periodo.month)
+            futuro = _executor_backtest_ajustes.submit(prever, treino, periodos, config, motor,
+                                                       persistir=False, cachear=False)
+            pendentes.append((periodo, dia, real, ultimo_real, dias_para_prever, futuro))
+
+    linhas = []
+    for periodo, dia, real, ultimo_real, dias_para_prever, futuro in pendentes:
+        try:
+            forecast = futuro.result()
+        except Exception:
+            continue
+        _, proj = resumir_projecao(forecast, ultimo_real, periodo.year, periodo.month, dias_para_prever)
+        if proj is None:
+            continue
+        linhas.append({'Mês': periodo.strftime('%m/%Y'), 'Dia de origem': dia, 'Projeção (%)': proj,
+                       'Real (%)': real, 'Erro (p.p.)': proj - real})
+    return pd.DataFrame(linhas)
+
+
+def agendar_backtest(diario, meses=MESES_BACKTEST, config=None, motor=None):
+    """
+    Executa backtest_fechamento fora da requisição e devolve o Future. Cada série é avaliada
+    uma única vez por processo; um backtest que falhou é devolvido por ESPERA_FALHA segundos
+    e só depois refeito.
+    """
+    nome = nome_motor(motor)
+    chave = fingerprint(serie_ocupacao(diario), {'backtest': meses, 'config': config}, nome)
+    with _lock:
+        futuro = _backtests.get(chave)
+        falha = _falhas_backtest.get(chave)
+        novo = futuro is None or (falha is not None and falha < time.monotonic() - ESPERA_FALHA)
+        if novo:
+            _falhas_backtest.pop(chave, None)
+            futuro = _executor_backtest.submit(backtest_fechamento, diario, meses, ORIGENS_BACKTEST, config, nome)
+            _backtests[chave] = futuro
+            while len(_backtests) > LIMITE_MEMORIA:
+                antiga, _ = _backtests.popitem(last=False)
+                _falhas_backtest.pop(antiga, None)
+        else:
+            _backtests.move_to_end(chave)
+
+    if novo:
+        futuro.add_done_callback(lambda f: _registrar_falha_backtest(chave, f))
+    return futuro
+
+
+def _registrar_falha_backtest(chave, futuro):
+    if futuro.exception() is not None:
+        with _lock:
+            _falhas_backtest[chave] = time.monotonic()
+
+
+def resumir_backtest(resultado, dia):
+    """Erro absoluto médio e viés do backtest na origem mais próxima de `dia` (sem passar dele, se possível)."""
+    if resultado is None or resultado.empty:
+        return None
+    origens = sorted(resultado['Dia de origem'].unique())
+    origem = max([o for o in origens if o <= dia], default=origens[0])
+    erros = resultado.loc[resultado['Dia de origem'] == origem, 'Erro (p.p.)']
+    return {'origem': int(origem), 'meses': len(erros), 'mae': float(erros.abs().mean()), 'vies': float(erros.mean())}
+
+
+def prever_por_setor(df, ano, mes, config=None, motor=None):
+    """
+    Agenda um modelo por setor; os ajustes rodam em paralelo no pool de workers.
+    O horizonte é calculado por setor: um setor cujos dados terminam antes é previsto até o fim do mês.
+    """
+    futuros = {}
+    for setor, grupo in df.groupby('Setor', observed=True):
+        serie = serie_ocupacao(grupo)
+        futuros[setor] = agendar_previsao(serie, horizonte_mes(serie, ano, mes)[2], config, motor)
+    return futuros
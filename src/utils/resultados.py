@@ -0,0 +1,191 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+
+from src.utils.cubo import CuboOcupacao
+from src.utils.indicadores import base_indicadores, consolidar
+from src.utils.motores import obter_motor, nome_motor
+from src.utils.previsao import serie_ocupacao, horizonte_mes, resumir_projecao, agendar_previsao
+
+# Resultados pré-calculados em lote (ex.: cron noturno); o dashboard lê daqui antes de calcular ao vivo
+RESULTADOS_DB = Path(os.environ.get("DSH_RESULTADOS_DB", Path(os.environ.get("DSH_CACHE_DIR", ".cache")) / "resultados.sqlite"))
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS kpis (
+    dataset TEXT, ano INTEGER, mes INTEGER, setores TEXT,
+    ocupacao REAL, permanencia REAL, giro REAL, calculado_em TEXT,
+    PRIMARY KEY (dataset, ano, mes, setores));
+CREATE TABLE IF NOT EXISTS projecoes (
+    dataset TEXT, ano INTEGER, mes INTEGER, setores TEXT, motor TEXT,
+    projecao REAL, tendencia TEXT, calculado_em TEXT,
+    PRIMARY KEY (dataset, ano, mes, setores, motor));
+"""
+
+COLUNAS_TENDENCIA = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+
+def chave_setores(setores):
+    """Identifica o conjunto de setores, independente da ordem de seleção."""
+    return hashlib.sha1("\n".join(sorted(map(str, setores))).encode()).hexdigest()[:16]
+
+
+def conectar(caminho=None):
+    caminho = Path(caminho or RESULTADOS_DB)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(caminho, timeout=30)
+    # WAL: o dashboard continua lendo enquanto o lote grava
+    con.execute("PRAGMA journal_mode=WAL")
+    con.executescript(ESQUEMA)
+    return con
+
+
+def _consultar(sql, parametros, caminho=None):
+    caminho = Path(caminho or RESULTADOS_DB)
+    if not caminho.exists():
+        return None
+    try:
+        with closing(sqlite3.connect(caminho, timeout=5)) as con:
+            return con.execute(sql, parametros).fetchone()
+    except sqlite3.Error:
+        # Banco ainda sem as tabelas ou bloqueado: o dashboard calcula ao vivo
+        return None
+
+
+def buscar_kpis(dataset, ano, mes, setores, caminho=None):
+    """(ocupação, permanência, giro) pré-calculados, ou None se a combinação não estiver no banco."""
+    return _consultar("SELECT ocupacao, permanencia, giro FROM kpis WHERE dataset=? AND ano=? AND mes=? AND setores=?",
+                      (dataset, int(ano), int(mes), chave_setores(setores)), caminho)
+
+
+def buscar_projecao(dataset, ano, mes, setores, motor=None, caminho=None):
+    """(tendência de 7 dias, projeção de fechamento) pré-calculadas, ou None."""
+    linha = _consultar("SELECT projecao, tendencia FROM projecoes "
+                       "WHERE dataset=? AND ano=? AND mes=? AND setores=? AND motor=?",
+                       (dataset, int(ano), int(mes), chave_setores(setores), nome_motor(motor)), caminho)
+    if linha is None:
+        return None
+    projecao, tendencia = linha
+    df_pred = pd.DataFrame(json.loads(tendencia), columns=COLUNAS_TENDENCIA)
+    df_pred['ds'] = pd.to_datetime(df_pred['ds'])
+    return df_pred, projecao
+
+
+# --- CÁLCULO EM LOTE ---
+
+def conjuntos_setores(cubo, anos=None, individuais=True):
+    """
+    Conjuntos de setores a pré-calcular: o padrão da página (todos os setores do ano)
+    para cada ano e, opcionalmente, cada setor isolado.
+    """
+    conjuntos = {}
+    for ano in anos or cubo.anos('Internação'):
+        setores = cubo.setores('Internação', ano)
+        conjuntos[chave_setores(setores)] = setores
+        if individuais:
+            for setor in setores:
+                conjuntos.setdefault(chave_setores([setor]), [setor])
+    return conjuntos
+
+
+def precalcular(df, dataset, mes_aberto=None, motor=None, individuais=True, caminho=None):
+    """
+    Calcula KPIs de todos os meses e a projeção do mês em aberto para cada conjunto de setores,
+    com as mesmas funções usadas pela página de ocupação, e grava no banco de resultados.
+    As previsões são agendadas todas de uma vez no pool de workers e ajustadas em paralelo.
+    """
+    agora = datetime.now().isoformat(timespec='seconds')
+    motor = obter_motor(motor).nome
+    cubo = CuboOcupacao(df)
+    base = base_indicadores(cubo)
+
+    conjuntos = conjuntos_setores(cubo, individuais=individuais)
+    linhas_kpi = []
+    for chave, setores in conjuntos.items():
+        mensal = consolidar(base, 'Internação', setores=setores, por=['Ano', 'Mes'])
+        linhas_kpi += [(dataset, int(ano), int(mes), chave, float(ocup), float(perm), float(giro), agora)
+                       for ano, mes, ocup, perm, giro
+                       in mensal[['Ano', 'Mes', 'ocupacao', 'permanencia', 'giro']].itertuples(index=False)]
+
+    # Projeção só faz sentido no mês em aberto, e apenas para setores ativos naquele ano
+    mes_aberto = mes_aberto or (date.today().year, date.today().month)
+    ano_ab, mes_ab = mes_aberto
+    agendadas = {}
+    if ano_ab in cubo.anos('Internação') and mes_ab in cubo.meses('Internação', ano_ab):
+        for chave, setores in conjuntos_setores(cubo, anos=[ano_ab], individuais=individuais).items():
+            serie = serie_ocupacao(cubo.serie_diaria('Internação', setores))
+            ultimo_real, dias_para_prever, periodos = horizonte_mes(serie, ano_ab, mes_ab)
+            agendadas[chave] = (agendar_previsao(serie, periodos, motor=motor), ultimo_real, dias_para_prever)
+
+    linhas_proj, falhas = [], 0
+    for chave, (futuro, ultimo_real, dias_para_prever) in agendadas.items():
+        try:
+            forecast = futuro.result()
+        except Exception as e:
+            falhas += 1
+            print(f"Falha na previsão do conjunto {chave}: {e}", file=sys.stderr)
+            continue
+        df_pred, proj = resumir_projecao(forecast, ultimo_real, ano_ab, mes_ab, dias_para_prever)
+        tendencia = df_pred[COLUNAS_TENDENCIA].assign(ds=df_pred['ds'].dt.strftime('%Y-%m-%d'))
+        linhas_proj.append((dataset, ano_ab, mes_ab, chave, motor, None if proj is None else float(proj),
+                            json.dumps(tendencia.to_dict('records')), agora))
+
+    # closing fecha a conexão; o `with con` interno faz o commit (ou rollback) da gravação
+    with closing(conectar(caminho)) as con, con:
+        con.executemany("INSERT OR REPLACE INTO kpis VALUES (?, ?, ?, ?, ?, ?, ?, ?)", linhas_kpi)
+        con.executemany("INSERT OR REPLACE INTO projecoes VALUES (?, ?, ?, ?, ?, ?, ?, ?)", linhas_proj)
+    return {'conjuntos': len(conjuntos), 'kpis': len(linhas_kpi), 'projecoes': len(linhas_proj), 'falhas': falhas}
+
+
+def descartar_outros(dataset, caminho=None):
+    """Remove resultados de datasets anteriores (o histórico muda de chave a cada carga)."""
+    with closing(conectar(caminho)) as con, con:
+        for tabela in ('kpis', 'projecoes'):
+            con.execute(f"DELETE FROM {tabela} WHERE dataset <> ?", (dataset,))
+
+
+def main():
+    from src.utils.ingest import carregar_dataset, carregar_historico, hash_historico
+
+    parser = argparse.ArgumentParser(
+        description="Pré-calcula KPIs e projeções do dashboard de ocupação (ex.: cron noturno).")
+    origem = parser.add_mutually_exclusive_group(required=True)
+    origem.add_argument("csv", nargs="?", help="CSV de movimentação (mesmo arquivo enviado no dashboard)")
+    origem.add_argument("--historico", action="store_true", help="Usa o histórico incremental salvo no servidor")
+    parser.add_argument("--mes-aberto", help="Mês a projetar (aaaa-mm); padrão: mês atual")
+    parser.add_argument("--motor", default=None, help="Motor de previsão; padrão: DSH_MOTOR_PREVISAO")
+    parser.add_argument("--sem-setores-individuais", action="store_true",
+                        help="Calcula só o conjunto padrão de setores de cada ano")
+    parser.add_argument("--banco", type=Path, default=RESULTADOS_DB)
+    parser.add_argument("--descartar-outros", action="store_true", help="Apaga resultados de outros datasets")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.historico:
+        dataset, df = hash_historico(), carregar_historico()
+        if df is None:
+            parser.error("histórico vazio")
+    else:
+        dataset, df = carregar_dataset(Path(args.csv).read_bytes())
+
+    mes_aberto = tuple(int(p) for p in args.mes_aberto.split('-')) if args.mes_aberto else None
+    resumo = precalcular(df, dataset, mes_aberto, args.motor, not args.sem_setores_individuais, args.banco)
+    if args.descartar_outros:
+        descartar_outros(dataset, args.banco)
+
+    print(f"{resumo['kpis']} KPIs e {resumo['projecoes']} projeções de {resumo['conjuntos']} conjuntos de setores "
+          f"gravados em {args.banco} ({time.perf_counter() - inicio:.1f}s)")
+    if resumo['falhas']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
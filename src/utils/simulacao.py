@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+CENARIOS_PADRAO = np.arange(0, 55, 5)  # aumento de altas: 0% a 50%
+LIMITES = (98, 85)
+# Semente usada pelo dashboard: os mesmos filtros sempre exibem as mesmas probabilidades
+SEMENTE_PADRAO = 0
+
+
+def matrizes_historicas(df_hist):
+    """
+    Organiza o histórico em matrizes Dia x Setor: internações, taxa de saída
+    (Saídas / Paciente-Dia), paciente-dia e leitos-dia.
+    """
+    tabela = df_hist.pivot_table(index='Data', columns='Setor', observed=True, aggfunc='sum',
+                                 values=['Intern.', 'Saídas', 'Paciente/Dia', 'Leitos-dia'])
+    internacoes = tabela['Intern.'].fillna(0).to_numpy(dtype='float64')
+    pacientes = tabela['Paciente/Dia'].fillna(0).to_numpy(dtype='float64')
+    leitos = tabela['Leitos-dia'].ffill().fillna(0).to_numpy(dtype='float64')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        taxa_saida = tabela['Saídas'].to_numpy(dtype='float64') / pacientes
+    # Dias sem paciente (ou sem registro) recebem a taxa média do setor
+    media_setor = np.nanmean(np.where(np.isfinite(taxa_saida), taxa_saida, np.nan), axis=0)
+    taxa_saida = np.where(np.isfinite(taxa_saida), taxa_saida, np.nan_to_num(media_setor))
+
+    # Calibração: no cenário sem mudança, o censo de equilíbrio (internações / taxa de saída)
+    # deve coincidir com o censo médio observado no período
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ajuste = (internacoes.mean(axis=0) / pacientes.mean(axis=0)) / taxa_saida.mean(axis=0)
+    taxa_saida = taxa_saida * np.where(np.isfinite(ajuste), ajuste, 1)
+
+    return internacoes, np.clip(taxa_saida, 0, 1), pacientes, leitos
+
+
+def simular_capacidade(df_hist, cenarios=CENARIOS_PADRAO, horizonte=30, n_simulacoes=2000, semente=None):
+    """
+    Simulação Monte Carlo da ocupação para cada cenário de aumento de altas.
+
+    Cada trajetória sorteia (bootstrap) dias inteiros do histórico, preservando a correlação
+    entre setores: as internações entram no censo e a taxa de saída do dia, multiplicada
+    por (1 + aumento), define quantos pacientes saem. Todas as trajetórias e cenários
+    avançam juntos como arrays (cenário x trajetória x setor), um dia por iteração.
+    """
+    internacoes, taxa_saida, pacientes, leitos = matrizes_historicas(df_hist)
+    n_dias, n_setores = internacoes.shape
+    if n_dias == 0:
+        return pd.DataFrame()
+
+    rng = np.random.default_rng(semente)
+    fator = (1 + np.asarray(cenarios, dtype='float64') / 100)[:, None, None]
+
+    capacidade = leitos[-1].sum()
+    if capacidade <= 0:
+        return pd.DataFrame()
+
+    censo = np.broadcast_to(pacientes[-1], (len(cenarios), n_simulacoes, n_setores)).copy()
+    sorteio = rng.integers(0, n_dias, size=(horizonte, n_simulacoes))
+
+    ocupacao_dia = np.empty((horizonte, len(cenarios), n_simulacoes))
+    for t in range(horizonte):
+        dia = sorteio[t]
+        saidas = censo * np.minimum(taxa_saida[dia] * fator, 1)
+        censo = censo - saidas + internacoes[dia]
+        ocupacao_dia[t] = censo.sum(axis=2) / capacidade * 100
+
+    ocupacao_media = ocupacao_dia.mean(axis=0)  # cenário x trajetória
+    resultado = pd.DataFrame({
+        'Aumento de altas (%)': np.asarray(cenarios),
+        'Ocupação esperada (%)': ocupacao_media.mean(axis=1),
+        'Ocupação P90 (%)': np.percentile(ocupacao_media, 90, axis=1),
+    })
+    for limite in LIMITES:
+        resultado[f'P(> {limite}%)'] = (ocupacao_media > limite).mean(axis=1)
+    resultado['Dias > 98% (média)'] = (ocupacao_dia > 98).sum(axis=0).mean(axis=1)
+    return resultado
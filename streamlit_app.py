@@ -1,39 +1,44 @@
+import os
 import streamlit as st
-import pandas as pd
-from src.pages import (home, ocupacao_geral, ocupacao_uti, mortalidade, 
-                      permanencia_cirurgica, permanencia_clinica, permanencia_ps)
+from src.utils.paginas import PAGINAS, PAGINA_INICIAL, carregar_pagina, importar_bibliotecas, relatorio_importacao
+
+# Relatório de importação (DSH_RELATORIO_IMPORTS=1): as bibliotecas comuns são medidas antes de
+# qualquer outro módulo do app, já que `desempenho` importa pandas e numpy
+RELATORIO_IMPORTS = os.environ.get("DSH_RELATORIO_IMPORTS") == "1"
+if RELATORIO_IMPORTS:
+    importar_bibliotecas()
+
+from src.utils import desempenho  # noqa: E402
 
 st.set_page_config(page_title="Data Science Hospitalar", layout="wide")
 
-# Inicialização do session_state para o dataframe
-if 'df' not in st.session_state:
-    st.session_state.df = None
+# Inicialização do session_state para o dataset (handle do repositório compartilhado)
+if 'dataset' not in st.session_state:
+    st.session_state.dataset = None
 
 # --- SIDEBAR NAVEGAÇÃO ---
 st.sidebar.title("🏥 Hospital Analytics")
 page = st.sidebar.radio(
     "Selecione o Indicador:",
-    ["Página Inicial", "Taxa de Ocupação Hospitalar", "Taxa de Ocupação da UTI", 
-     "Taxa de Mortalidade", "Tempo de Permanência em leitos Cirurgicos", 
-     "Tempo de Permanência em leitos de Clínica Médica", "Tempo de Permanência no Pronto Socorro"]
+    list(PAGINAS)
 )
 
 # --- LÓGICA DE ROTEAMENTO ---
-if page == "Página Inicial":
-    home.show()
+# Cada página (e suas bibliotecas pesadas) só é importada quando selecionada
+desempenho.iniciar_rerun(page)
+if page == PAGINA_INICIAL or st.session_state.dataset is not None:
+    with desempenho.trecho("importar_pagina"):
+        modulo = carregar_pagina(page)
+    modulo.show()
 else:
-    if st.session_state.df is not None:
-        if page == "Taxa de Ocupação Hospitalar":
-            ocupacao_geral.show()
-        elif page == "Taxa de Ocupação da UTI":
-            ocupacao_uti.show()
-        elif page == "Taxa de Mortalidade":
-            mortalidade.show()
-        elif page == "Tempo de Permanência em leitos Cirurgicos":
-            permanencia_cirurgica.show()
-        elif page == "Tempo de Permanência em leitos de Clínica Médica":
-            permanencia_clinica.show()
-        elif page == "Tempo de Permanência no Pronto Socorro":
-            permanencia_ps.show()
-    else:
-        st.warning("⚠️ Por favor, faça o upload do arquivo CSV na Página Inicial para prosseguir.")
\ No newline at end of file
+    st.warning("⚠️ Por favor, faça o upload do arquivo CSV na Página Inicial para prosseguir.")
+registro_desempenho = desempenho.finalizar_rerun()
+
+# Relatório de partida: custo de importação por módulo neste processo
+if RELATORIO_IMPORTS:
+    with st.sidebar.expander("⏱️ Tempo de importação"):
+        st.dataframe(relatorio_importacao(), hide_index=True, use_container_width=True)
+
+# Painel de depuração (trechos do rerun e memória do dataset) com DSH_PAINEL_DESEMPENHO=1
+if desempenho.PAINEL_ATIVO:
+    desempenho.painel(registro_desempenho)
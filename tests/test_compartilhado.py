@@ -0,0 +1,55 @@
+import gc
+
+import pandas as pd
+import pytest
+
+from src.utils import compartilhado
+
+
+@pytest.fixture(autouse=True)
+def diretorio(tmp_path, monkeypatch):
+    monkeypatch.setattr(compartilhado, 'COMPARTILHADO_DIR', tmp_path)
+    return tmp_path
+
+
+def _df():
+    return pd.DataFrame({'Data': pd.date_range('2025-01-01', periods=3), 'Setor': ['UTI'] * 3,
+                         'Paciente/Dia': [1, 2, 3]})
+
+
+def _sessoes(chave):
+    resumo = compartilhado.resumo()
+    linha = resumo[resumo['Dataset'] == chave[:12]]
+    return None if linha.empty else int(linha['Sessões'].iloc[0])
+
+
+def test_sessoes_compartilham_e_liberam_o_dataset(diretorio):
+    cargas = []
+
+    def carregar():
+        cargas.append(1)
+        return _df()
+
+    primeira = compartilhado.abrir('abc', carregar)
+    segunda = compartilhado.abrir('abc', carregar)
+    assert len(cargas) == 1
+    assert primeira.df is segunda.df
+    assert _sessoes('abc') == 2
+    pd.testing.assert_frame_equal(primeira.df, _df(), check_dtype=False)
+
+    del primeira
+    gc.collect()
+    assert _sessoes('abc') == 1
+    assert list(diretorio.glob('abc.*.arrow'))
+
+    del segunda
+    gc.collect()
+    assert _sessoes('abc') is None
+    assert not list(diretorio.glob('abc.*.arrow'))
+
+
+def test_arquivo_existente_nao_e_recarregado(diretorio):
+    compartilhado._gravar(compartilhado._caminho('def'), _df())
+    referencia = compartilhado.abrir('def', lambda: pytest.fail("não deveria recarregar"))
+    assert len(referencia.df) == 3
+    assert compartilhado.resumo()['Arquivo (MB)'].iloc[0] >= 0
@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+
+from benchmarks.gerar_dados import gerar
+from src.utils.consultas import ConsultaArrow, DatasetParquet, ler_filtrado
+from src.utils.cubo import COLUNAS_SOMA, CuboOcupacao, CuboParquet
+from src.utils.ingest import tipar_colunas
+
+
+@pytest.fixture(scope="module")
+def df():
+    return gerar(setores=4, anos=2, origens=2, fim='2025-06-30')
+
+
+def _por_setor(fatia):
+    return fatia.groupby('Setor', observed=True)[COLUNAS_SOMA].sum().sort_index()
+
+
+def test_mes_igual_ao_groupby_dos_dados_brutos(df):
+    cubo = CuboOcupacao(df)
+    for origem in ('Internação', 'Pronto Socorro'):
+        for ano in cubo.anos(origem):
+            for mes in cubo.meses(origem, ano):
+                bruto = df[(df['Origem'] == origem) & (df['Data'].dt.year == ano) & (df['Data'].dt.month == mes)]
+                pd.testing.assert_frame_equal(_por_setor(cubo.mes(origem, ano, mes)), _por_setor(bruto),
+                                              check_dtype=False, check_categorical=False)
+
+
+def test_mes_inclui_registros_com_hora_no_ultimo_dia():
+    df = pd.DataFrame({'Data': pd.to_datetime(['2025-01-31 00:00', '2025-01-31 18:30', '2025-02-01 00:00']),
+                       'Setor': ['UTI'] * 3, 'Origem': ['Internação'] * 3,
+                       'Paciente/Dia': [1, 2, 4], 'Leitos-dia': [10, 10, 10]})
+    cubo = CuboOcupacao(df)
+    assert cubo.mes('Internação', 2025, 1)['Paciente/Dia'].sum() == 3
+    assert cubo.mes('Internação', 2025, 2)['Paciente/Dia'].sum() == 4
+    assert cubo.ano('Internação', 2025)['Paciente/Dia'].sum() == 7
+
+
+def test_cubo_parquet_igual_ao_cubo_em_memoria(df, tmp_path):
+    caminho = tmp_path / "dataset.parquet"
+    df.to_parquet(caminho, index=False)
+    memoria, parquet = CuboOcupacao(df), CuboParquet([caminho], ConsultaArrow())
+
+    assert parquet.anos('Internação') == memoria.anos('Internação')
+    ano = memoria.anos('Internação')[0]
+    assert parquet.setores('Internação', ano) == [str(s) for s in memoria.setores('Internação', ano)]
+    for mes in memoria.meses('Internação', ano):
+        pd.testing.assert_frame_equal(_por_setor(parquet.mes('Internação', ano, mes)),
+                                      _por_setor(memoria.mes('Internação', ano, mes)),
+                                      check_dtype=False, check_categorical=False, check_index_type=False)
+
+
+def test_dataset_parquet_nao_carrega_o_dataframe(df, tmp_path):
+    metades = [tmp_path / "a.parquet", tmp_path / "b.parquet"]
+    df.iloc[:100].to_parquet(metades[0], index=False)
+    df.iloc[100:].to_parquet(metades[1], index=False)
+    referencia = DatasetParquet('chave', metades)
+
+    assert not referencia.em_memoria
+    assert referencia.linhas == len(df)
+    pd.testing.assert_frame_equal(referencia.previa(3).astype(str), df.head(3).astype(str))
+
+
+def test_particoes_com_tipos_diferentes(tmp_path):
+    # Partições gravadas com tipar_colunas por mês: Paciente/Dia int8, int16 e float; o último
+    # mês tem mais de 127 setores, então os índices da categoria também mudam de tipo
+    meses = [([8], ['UTI']), ([300], ['UTI']), ([None] + [1] * 199, [f'S{i:03d}' for i in range(200)])]
+    partes, fontes = [], []
+    for mes, (valores, setores) in enumerate(meses, start=1):
+        parte = pd.DataFrame({'Data': pd.Timestamp(2025, mes, 1), 'Setor': setores, 'Origem': 'Internação',
+                              **{col: 1 for col in COLUNAS_SOMA}})
+        parte['Paciente/Dia'] = valores
+        fontes.append(tmp_path / f"2025-{mes:02d}.parquet")
+        tipar_colunas(parte.copy()).to_parquet(fontes[-1], index=False)
+        partes.append(parte)
+    memoria, parquet = CuboOcupacao(pd.concat(partes, ignore_index=True)), CuboParquet(fontes, ConsultaArrow())
+
+    assert parquet.anos('Internação') == memoria.anos('Internação')
+    for mes in (1, 2, 3):
+        pd.testing.assert_frame_equal(_por_setor(parquet.mes('Internação', 2025, mes)),
+                                      _por_setor(memoria.mes('Internação', 2025, mes)),
+                                      check_dtype=False, check_categorical=False, check_index_type=False)
+    linhas = ler_filtrado(fontes, origens=['Internação'])
+    assert len(linhas) == 202
+    assert linhas['Paciente/Dia'].sum() == 8 + 300 + 199
+    assert len(DatasetParquet('chave', fontes).previa(3)) == 3
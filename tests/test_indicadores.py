@@ -0,0 +1,40 @@
+import pytest
+
+from benchmarks.gerar_dados import gerar
+from src.utils.cubo import CuboOcupacao
+from src.utils.indicadores import base_indicadores, consolidar
+
+
+def calc_metrics_legado(data):
+    # Cálculo original da página de ocupação, sobre as linhas brutas
+    if data.empty: return 0, 0, 0
+    p, l, s = data['Paciente/Dia'].sum(), data['Leitos-dia'].sum(), data['Saídas'].sum()
+    taxa = (p/l*100 if l>0 else 0)
+    perm = (p/s if s>0 else 0)
+    giro = (s/data['Leitos Ativos'].mean() if data['Leitos Ativos'].mean()>0 else 0)
+    return taxa, perm, giro
+
+
+@pytest.fixture(scope="module")
+def df():
+    return gerar(setores=4, anos=2, origens=2, fim='2025-06-30')
+
+
+def test_indicadores_iguais_ao_calculo_legado(df):
+    base = base_indicadores(CuboOcupacao(df))
+    internacao = df[df['Origem'] == 'Internação']
+    setores = sorted(internacao['Setor'].unique())[:3]
+    for (ano, mes), _ in internacao.groupby([internacao['Data'].dt.year, internacao['Data'].dt.month]):
+        for selecao in (setores, setores[:1]):
+            bruto = internacao[(internacao['Data'].dt.year == ano) & (internacao['Data'].dt.month == mes)
+                               & internacao['Setor'].isin(selecao)]
+            total = consolidar(base, 'Internação', ano, mes, selecao)
+            assert (total['ocupacao'], total['permanencia'], total['giro']) == pytest.approx(calc_metrics_legado(bruto))
+
+
+def test_consolidar_nao_mistura_origens(df):
+    base = base_indicadores(CuboOcupacao(df))
+    internacao = df[(df['Origem'] == 'Internação') & (df['Data'].dt.year == 2025) & (df['Data'].dt.month == 3)]
+    total = consolidar(base, 'Internação', 2025, 3)
+    assert total['Paciente/Dia'] == internacao['Paciente/Dia'].sum()
+    assert consolidar(base, None, 2025, 3)['Paciente/Dia'] > total['Paciente/Dia']
@@ -0,0 +1,47 @@
+import io
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from src.utils.ingest import anexar_csv, carregar_historico, particoes_historico
+
+
+def _csv(linhas):
+    colunas = ['Data', 'Setor', 'Origem', 'Paciente/Dia', 'Leitos-dia']
+    return io.StringIO(pd.DataFrame(linhas, columns=colunas).to_csv(index=False))
+
+
+def test_anexar_deduplica_e_sobrescreve_o_mes(tmp_path):
+    anexar_csv(_csv([('30/01/2025', 'UTI', 'Internação', 8, 10),
+                     ('01/02/2025', 'UTI', 'Internação', 9, 10),
+                     ('01/02/2025', 'UTI', 'Internação', 7, 10)]), tmp_path)
+
+    resumo = anexar_csv(_csv([('01/02/2025', 'UTI', 'Internação', 5, 10),
+                              ('02/02/2025', 'UTI', 'Internação', 6, 10)]), tmp_path)
+
+    assert resumo == {'linhas': 2, 'meses': ['2025-02']}
+    assert [p.name for p in particoes_historico(tmp_path)] == ['2025-01.parquet', '2025-02.parquet']
+
+    historico = carregar_historico(tmp_path).set_index('Data')['Paciente/Dia']
+    # Uma linha por (Data, Setor, Origem); a carga mais recente prevalece e janeiro fica intacto
+    assert historico.to_dict() == {pd.Timestamp('2025-01-30'): 8,
+                                   pd.Timestamp('2025-02-01'): 5,
+                                   pd.Timestamp('2025-02-02'): 6}
+
+
+def test_anexar_sem_coluna_obrigatoria(tmp_path):
+    arquivo = io.StringIO("Setor,Origem,Paciente/Dia\nUTI,Internação,8\n")
+    with pytest.raises(ValueError, match="Colunas obrigatórias ausentes no arquivo: Data"):
+        anexar_csv(arquivo, tmp_path)
+
+
+def test_particoes_com_o_mesmo_schema(tmp_path):
+    # O menor tipo de cada mês seria int8, int16 e float (faltante); o histórico grava um tipo só
+    anexar_csv(_csv([('01/01/2025', 'UTI', 'Internação', 8, 10)]), tmp_path)
+    anexar_csv(_csv([('01/02/2025', 'UTI', 'Internação', 300, 400)]), tmp_path)
+    anexar_csv(_csv([('01/03/2025', 'UTI', 'Internação', None, 10)]), tmp_path)
+
+    schemas = [pq.read_schema(p).remove_metadata() for p in particoes_historico(tmp_path)]
+    assert all(schema.equals(schemas[0]) for schema in schemas)
+    assert carregar_historico(tmp_path)['Paciente/Dia'].tolist()[:2] == [8, 300]
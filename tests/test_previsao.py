@@ -0,0 +1,237 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils import motores, previsao
+from src.utils.motores import MotorRapido
+
+
+class MotorDisco:
+    """Motor mínimo para exercitar o cache em disco."""
+    nome = 'teste'
+
+    def __init__(self, ao_ler=None):
+        self.ao_ler = ao_ler
+
+    def serializar(self, modelo):
+        return modelo
+
+    def desserializar(self, texto):
+        if self.ao_ler:
+            self.ao_ler()
+        return texto
+
+
+class MotorFalho(MotorRapido):
+    """Motor em segundo plano cujo ajuste sempre falha."""
+    nome = 'falho'
+    sincrono = False
+    ajustes = 0
+
+    def ajustar(self, serie, config):
+        MotorFalho.ajustes += 1
+        raise RuntimeError("ajuste inviável")
+
+
+class MotorContado(MotorRapido):
+    """Motor rápido mais lento, que conta os ajustes feitos."""
+    nome = 'contado'
+    ajustes = 0
+
+    def ajustar(self, serie, config):
+        MotorContado.ajustes += 1
+        time.sleep(0.05)
+        return super().ajustar(serie, config)
+
+
+class MotorAquecido(MotorRapido):
+    """Motor rápido que aceita ponto de partida e registra o que recebeu."""
+    nome = 'aquecido'
+    aquecimento = True
+    iniciais = []
+
+    def ajustar(self, serie, config, inicial=None):
+        MotorAquecido.iniciais.append(inicial)
+        return super().ajustar(serie, config)
+
+    @staticmethod
+    def inicial_compativel(modelo, serie, config):
+        return True
+
+
+@pytest.fixture(autouse=True)
+def estado_limpo(monkeypatch):
+    for nome in ('_memoria', '_backtests'):
+        monkeypatch.setattr(previsao, nome, previsao.OrderedDict())
+    for nome in ('_pendentes', '_falhas', '_falhas_backtest'):
+        monkeypatch.setattr(previsao, nome, {})
+    for motor in (MotorFalho, MotorContado, MotorAquecido):
+        monkeypatch.setitem(motores.MOTORES, motor.nome, motor)
+    MotorFalho.ajustes, MotorContado.ajustes, MotorAquecido.iniciais = 0, 0, []
+
+
+def _serie(dias=60, inicio='2025-01-01'):
+    ds = pd.date_range(inicio, periods=dias)
+    return pd.DataFrame({'ds': ds, 'y': 80 + 5 * np.sin(np.arange(dias) * 2 * np.pi / 7)})
+
+
+def _diario(inicio='2024-07-01', fim='2025-03-15', ocupacao=80):
+    datas = pd.date_range(inicio, fim)
+    return pd.DataFrame({'Data': datas, 'Setor': 'UTI', 'Paciente/Dia': ocupacao, 'Leitos-dia': 100})
+
+
+def _esperar(condicao, limite=5):
+    # Os callbacks do Future rodam no worker logo depois de result() liberar quem espera
+    fim = time.monotonic() + limite
+    while not condicao():
+        assert time.monotonic() < fim
+        time.sleep(0.01)
+
+
+def test_falha_da_previsao_nao_e_reagendada_ate_expirar(monkeypatch):
+    serie = _serie()
+    futuro = previsao.agendar_previsao(serie, 7, motor='falho')
+    with pytest.raises(RuntimeError):
+        futuro.result()
+    _esperar(lambda: previsao._falhas)
+
+    # Dentro da espera o mesmo Future (com a falha) é devolvido, sem novo ajuste
+    assert previsao.agendar_previsao(serie, 7, motor='falho') is futuro
+    assert MotorFalho.ajustes == 1
+
+    monkeypatch.setattr(previsao, 'ESPERA_FALHA', 0)
+    novo = previsao.agendar_previsao(serie, 7, motor='falho')
+    assert novo is not futuro
+    with pytest.raises(RuntimeError):
+        novo.result()
+    assert MotorFalho.ajustes == 2
+
+
+def test_falha_do_backtest_nao_e_reagendada_ate_expirar(monkeypatch):
+    chamadas = []
+
+    def backtest_falho(*args):
+        chamadas.append(args)
+        raise RuntimeError("backtest inviável")
+
+    monkeypatch.setattr(previsao, 'backtest_fechamento', backtest_falho)
+    diario = _diario()
+    futuro = previsao.agendar_backtest(diario, motor='rapido')
+    with pytest.raises(RuntimeError):
+        futuro.result()
+    _esperar(lambda: previsao._falhas_backtest)
+
+    assert previsao.agendar_backtest(diario, motor='rapido') is futuro
+    assert len(chamadas) == 1
+
+    monkeypatch.setattr(previsao, 'ESPERA_FALHA', 0)
+    novo = previsao.agendar_backtest(diario, motor='rapido')
+    assert novo is not futuro
+    with pytest.raises(RuntimeError):
+        novo.result()
+    assert len(chamadas) == 2
+
+
+def test_um_ajuste_por_fingerprint_com_pedidos_concorrentes():
+    series = [_serie(), _serie(inicio='2024-01-01')]
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        chaves = list(pool.map(lambda i: previsao.obter_modelo(series[i % 2], motor='contado')[0], range(6)))
+
+    assert MotorContado.ajustes == 2
+    assert len(set(chaves)) == 2
+
+
+@pytest.mark.parametrize('dias, nulos, changepoints', [(365, 0, 25), (20, 0, 15), (30, 10, 15), (1, 0, 1)])
+def test_inicial_compativel_com_changepoints_reduzidos(dias, nulos, changepoints):
+    pytest.importorskip('prophet')
+    serie = _serie(dias)
+    serie.loc[:nulos - 1, 'y'] = np.nan
+    config = motores.MotorProphet.config_padrao
+
+    def modelo(n):
+        return SimpleNamespace(params={'delta': np.zeros((1, n))})
+
+    assert motores.MotorProphet.inicial_compativel(modelo(changepoints), serie, config)
+    assert not motores.MotorProphet.inicial_compativel(modelo(changepoints + 1), serie, config)
+
+
+def test_ajuste_parte_do_modelo_da_serie_mais_curta():
+    serie = _serie()
+    _, anterior = previsao.obter_modelo(serie.iloc[:-3], motor='aquecido')
+    previsao.obter_modelo(serie, motor='aquecido')
+    assert MotorAquecido.iniciais == [None, anterior['modelo']]
+
+    # Fora da janela de aquecimento não há ponto de partida
+    longe = _serie(inicio='2024-01-01')
+    previsao.obter_modelo(longe.iloc[:-(previsao.JANELA_AQUECIMENTO + 1)], motor='aquecido')
+    assert previsao._modelo_anterior(longe, MotorAquecido.config_padrao, MotorAquecido()) is None
+
+
+def test_modelo_sem_cache_nao_entra_na_memoria():
+    serie = _serie()
+    _, entrada = previsao.obter_modelo(serie.iloc[:-3], motor='aquecido', cachear=False)
+    assert entrada['modelo'] is not None
+    assert not previsao._memoria
+    assert previsao._modelo_anterior(serie, MotorAquecido.config_padrao, MotorAquecido()) is None
+
+
+def test_backtest_fechamento_de_serie_constante():
+    resultado = previsao.backtest_fechamento(_diario(), meses=3, motor='rapido')
+
+    assert sorted(resultado['Mês'].unique()) == ['01/2025', '02/2025', '12/2024']
+    assert sorted(resultado['Dia de origem'].unique()) == list(previsao.ORIGENS_BACKTEST)
+    assert resultado['Real (%)'].tolist() == pytest.approx([80] * len(resultado))
+    assert resultado['Erro (p.p.)'].abs().max() == pytest.approx(0, abs=1e-6)
+    # Os ajustes do backtest não ocupam o cache em memória da página
+    assert not previsao._memoria
+
+    assert previsao.resumir_backtest(resultado, 10) == {'origem': 7, 'meses': 3, 'mae': pytest.approx(0, abs=1e-6),
+                                                        'vies': pytest.approx(0, abs=1e-6)}
+    assert previsao.resumir_backtest(resultado, 30)['origem'] == 21
+    # Antes da primeira origem, usa a primeira
+    assert previsao.resumir_backtest(resultado, 3)['origem'] == 7
+    assert previsao.resumir_backtest(pd.DataFrame(), 10) is None
+
+
+def test_backtest_ignora_origens_que_falham():
+    assert previsao.backtest_fechamento(_diario(), meses=2, motor='falho').empty
+    assert MotorFalho.ajustes == 6
+
+
+def test_carregar_disco_com_arquivo_removido_por_outro_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(previsao, 'MODELOS_DIR', tmp_path)
+    caminho = tmp_path / "abc.json"
+    caminho.write_text("modelo")
+
+    # O LRU de outro worker remove o arquivo entre a leitura e a marcação de uso
+    assert previsao._carregar_disco("abc", MotorDisco(ao_ler=caminho.unlink)) == "modelo"
+    assert previsao._carregar_disco("abc", MotorDisco()) is None
+
+
+def test_limite_disco_ignora_arquivos_ja_removidos(tmp_path, monkeypatch):
+    for nome in ("a", "b", "c"):
+        (tmp_path / f"{nome}.json").write_text("x" * 1024)
+    sumiu = tmp_path / "sumiu.json"
+    diretorio = SimpleNamespace(glob=lambda padrao: [sumiu, *sorted(tmp_path.glob(padrao))])
+    monkeypatch.setattr(previsao, 'MODELOS_DIR', diretorio)
+    monkeypatch.setattr(previsao, 'LIMITE_DISCO_MB', 2048 / 1024 ** 2)
+
+    previsao._aplicar_limite_disco()
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+def test_previsao_por_setor_vai_ate_o_fim_do_mes_em_cada_setor():
+    datas = pd.date_range('2025-01-01', '2025-03-20')
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'Data': np.tile(datas, 2), 'Setor': ['A'] * len(datas) + ['B'] * len(datas),
+                       'Paciente/Dia': rng.integers(70, 90, 2 * len(datas)), 'Leitos-dia': 100})
+    # O setor B tem dados só até dia 10
+    df = df[(df['Setor'] == 'A') | (df['Data'] <= '2025-03-10')]
+
+    futuros = previsao.prever_por_setor(df, 2025, 3, motor='rapido')
+    for futuro in futuros.values():
+        assert futuro.result()['ds'].max() == pd.Timestamp('2025-03-31')
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from benchmarks.gerar_dados import gerar
+from src.utils.cubo import CuboOcupacao
+from src.utils.indicadores import base_indicadores, consolidar
+from src.utils.previsao import horizonte_mes, prever, resumir_projecao, serie_ocupacao
+from src.utils.resultados import COLUNAS_TENDENCIA, buscar_kpis, buscar_projecao, precalcular
+
+
+@pytest.fixture(scope="module")
+def df():
+    return gerar(setores=3, anos=1, origens=2, fim='2025-06-20')
+
+
+def test_kpis_gravados_iguais_ao_consolidar(df, tmp_path):
+    banco = tmp_path / "resultados.sqlite"
+    resumo = precalcular(df, 'ds1', mes_aberto=(2025, 6), motor='rapido', caminho=banco)
+    assert resumo['falhas'] == 0 and resumo['projecoes'] > 0
+
+    cubo = CuboOcupacao(df)
+    base = base_indicadores(cubo)
+    setores = cubo.setores('Internação', 2025)
+    for ano, mes in [(2024, 7), (2025, 1), (2025, 6)]:
+        for selecao in (setores, setores[:1], list(reversed(setores))):
+            esperado = consolidar(base, 'Internação', ano, mes, selecao)
+            ocupacao, permanencia, giro = buscar_kpis('ds1', ano, mes, selecao, caminho=banco)
+            assert ocupacao == pytest.approx(esperado['ocupacao'])
+            assert permanencia == pytest.approx(esperado['permanencia'])
+            assert giro == pytest.approx(esperado['giro'])
+
+    assert buscar_kpis('outro', 2025, 6, setores, caminho=banco) is None
+
+
+def test_projecao_gravada_volta_igual(df, tmp_path):
+    banco = tmp_path / "resultados.sqlite"
+    precalcular(df, 'ds1', mes_aberto=(2025, 6), motor='rapido', individuais=False, caminho=banco)
+
+    cubo = CuboOcupacao(df)
+    setores = cubo.setores('Internação', 2025)
+    serie = serie_ocupacao(cubo.serie_diaria('Internação', setores))
+    ultimo_real, dias, periodos = horizonte_mes(serie, 2025, 6)
+    esperado_pred, esperado_proj = resumir_projecao(prever(serie, periodos, motor='rapido'), ultimo_real, 2025, 6, dias)
+
+    df_pred, proj = buscar_projecao('ds1', 2025, 6, setores, motor='rapido', caminho=banco)
+    assert proj == pytest.approx(esperado_proj)
+    pd.testing.assert_frame_equal(df_pred, esperado_pred[COLUNAS_TENDENCIA].reset_index(drop=True), check_dtype=False)
+    assert buscar_projecao('ds1', 2025, 6, setores, motor='prophet', caminho=banco) is None